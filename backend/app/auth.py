@@ -4,9 +4,13 @@ from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import get_db
 from app.models import User
+from app.services.passwords import pwd_context
+from app.utils.helpers import TTLCache
 import os
+import time
 import hashlib
 from dotenv import load_dotenv
 
@@ -18,11 +22,21 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Verified tokens: sha256(token) -> username, each kept until the token's exp
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# Detached User rows by username; invalidate_user() after changing a user
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+# Blocking variants; the login and register endpoints use the async ones
+# in app.services.passwords, which run in a dedicated thread pool
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return hashlib.sha256(plain_password.encode()).hexdigest() == hashed_password
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except ValueError:
+        return False
 
 def get_password_hash(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+    return pwd_context.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,21 +48,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def verify_token(token: str) -> Optional[str]:
+    """Username of a valid token, or None. Repeat calls skip the JWT crypto."""
+    key = hashlib.sha256(token.encode()).digest()
+    username = token_cache.get(key)
+    if username is not None:
+        return username
+    
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    username = payload.get("sub")
+    if username is None:
+        return None
+    
+    ttl = None
+    if payload.get("exp") is not None:
+        ttl = min(payload["exp"] - time.time(), token_cache.ttl)
+    if ttl is None or ttl > 0:
+        token_cache.set(key, username, ttl=ttl)
+    return username
+
+def get_user_by_token(token: str, db: Session) -> Optional[User]:
+    """
+    The user a token belongs to, attached to ``db``, or None. Cached users
+    are merged into the session without a SELECT, so callers can still
+    modify and commit them.
+    """
+    username = verify_token(token)
+    if username is None:
+        return None
+    
+    user = user_cache.get(username)
+    if user is None:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            return None
+        # Keep a detached copy in the cache and hand out an attached one
+        db.expunge(user)
+        user_cache.set(username, user)
+    return db.merge(user, load=False)
+
+def invalidate_user(*usernames: str):
+    """Drop cached users, e.g. after their profile or XP changed"""
+    for username in usernames:
+        user_cache.pop(username)
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
+    user = get_user_by_token(token, db)
     if user is None:
         raise credentials_exception
     return user
@@ -32,9 +32,51 @@ class Settings(BaseSettings):
     
     # Detection Settings
     DETECTION_CONFIDENCE: float = 0.5
-    FRAME_PROCESS_INTERVAL: float = 0.5  # seconds
+    FRAME_PROCESS_INTERVAL: float = 0.5  # seconds, minimum between processed frames
+    FRAME_MAX_INTERVAL: float = 4.0  # seconds, upper bound when loaded / stable
+    FRAME_MAX_AGE: float = 5.0  # seconds, older unprocessed frames are dropped
+    FRAME_STABLE_STREAK: int = 5  # focused frames in a row before sampling slows
     EYE_ASPECT_RATIO_THRESHOLD: float = 0.25
     HEAD_POSE_THRESHOLD: float = 30  # degrees
+    DETECTION_MAX_DIM: int = 640  # larger frames are decoded at 1/2 or 1/4 size
+    DETECTION_ROI_PADDING: float = 0.5  # face ROI padding, fraction of face size
+    
+    # Detector Backend
+    DETECTOR_BACKEND: str = "mediapipe"  # "mediapipe" or "synthetic" (load tests)
+    SYNTHETIC_SEED: Optional[int] = None  # fixed seed = reproducible statuses
+    SYNTHETIC_LATENCY_MS: float = 0.0  # simulated inference time per frame
+    SYNTHETIC_DECODE: bool = True  # still decode frames (realistic CPU cost)
+    SYNTHETIC_FOCUSED_RATIO: float = 0.7
+    SYNTHETIC_DISTRACTED_RATIO: float = 0.15  # the rest is "drowsy"
+    
+    # Focus State Smoothing
+    EAR_SMOOTHING: float = 0.4  # EMA weight of the newest EAR sample
+    EAR_CLOSED_THRESHOLD: float = 0.2  # below this the eyes count as closed
+    EAR_LOW_THRESHOLD: float = 0.23  # smoothed EAR below this is "distracted"
+    BLINK_MAX_DURATION: float = 0.5  # seconds, shorter closures are blinks
+    DROWSY_CLOSURE_SECONDS: float = 1.5  # eyes closed this long is "drowsy"
+    DROWSY_CLOSED_SAMPLES: int = 3  # ... and for at least this many samples in a row
+    PERCLOS_WINDOW: float = 60.0  # seconds of history for PERCLOS
+    PERCLOS_DROWSY: float = 0.3  # PERCLOS at/above this enters "drowsy"
+    PERCLOS_RECOVER: float = 0.15  # ... and it must fall below this to leave
+    STATUS_HOLD_FRAMES: int = 2  # frames a new status must hold before switching
+    
+    # Inference Executor
+    INFERENCE_EXECUTOR: str = "thread"  # "thread" or "process"
+    INFERENCE_WORKERS: int = 0  # 0 = one worker per CPU core
+    DETECTOR_POOL_SIZE: int = 32  # max live FaceMesh detectors per process
+    
+    # Detection Writes
+    DETECTION_QUEUE_SIZE: int = 5000  # buffered detections before producers wait
+    DETECTION_FLUSH_SIZE: int = 200  # rows per bulk insert
+    DETECTION_FLUSH_INTERVAL: float = 2.0  # seconds
+    LIVE_SESSION_CHECKPOINT_INTERVAL: float = 5.0  # seconds of session totals a crash can lose
+    
+    # Detection Storage
+    DETECTIONS_PARTITIONED: bool = False  # daily partitions (PostgreSQL only)
+    DETECTION_PARTITION_PREMAKE_DAYS: int = 7
+    DETECTION_PARTITION_MAINTENANCE_INTERVAL: float = 3600.0  # seconds between premake runs
+    DETECTION_RAW_RETENTION_DAYS: int = 30  # older rows are compacted to minutes
     
     # Focus Scoring
     FOCUS_HIGH_THRESHOLD: int = 70
@@ -43,9 +85,60 @@ class Settings(BaseSettings):
     # Session Settings
     MAX_SESSION_DURATION: int = 14400  # 4 hours in seconds
     HISTORY_LIMIT: int = 100
+    TIMELINE_MAX_POINTS: int = 240  # timelines are downsampled to at most this
+    
+    # Password Hashing
+    PASSWORD_HASH_SCHEME: str = "scrypt"  # "scrypt", "pbkdf2_sha256" or "bcrypt"
+    PASSWORD_SCRYPT_LOG_N: int = 15  # cost 2^15; 32 MiB per hash at block size 8
+    PASSWORD_SCRYPT_BLOCK_SIZE: int = 8
+    PASSWORD_PBKDF2_ROUNDS: int = 600000
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # threads for hashing; bounds concurrent KDF runs
+    
+    # Logging
+    LOG_SAMPLE_INTERVAL: float = 10.0  # seconds between per-frame log lines per connection
+    
+    # Caching
+    USERS_CACHE_TTL: float = 10.0  # seconds a /api/users page is served from cache
+    TOKEN_CACHE_SIZE: int = 4096  # verified JWTs (each kept until its exp)
+    USER_CACHE_SIZE: int = 1024  # authenticated users kept in memory
+    USER_CACHE_TTL: float = 60.0  # seconds; profile/XP updates invalidate sooner
+    
+    # Export
+    EXPORT_CHUNK_SIZE: int = 2000  # rows per server-side cursor fetch / encoded chunk
+    EXPORT_GZIP_LEVEL: int = 6
+    
+    # Email
+    SMTP_SERVER: str = "smtp.gmail.com"
+    SMTP_PORT: int = 587
+    SMTP_USERNAME: Optional[str] = None  # no login when unset (e.g. local debug server)
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT: float = 30.0  # seconds per SMTP command
+    FROM_EMAIL: str = "noreply@focusguardian.com"
+    SMTP_MAX_CONNECTIONS: int = 4  # pooled connections = concurrent deliveries
+    SMTP_BATCH_SIZE: int = 50  # queued messages sent per worker turn
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100  # reconnect after this many
+    SMTP_MAX_RETRIES: int = 3  # for temporary failures
+    SMTP_RETRY_BACKOFF: float = 2.0  # seconds, doubled per attempt
+    SMTP_IDLE_TIMEOUT: float = 30.0  # seconds before an idle connection is closed
+    SMTP_QUEUE_SIZE: int = 10000  # queued emails before producers wait
+    
+    # Reports
+    REPORT_RENDER_WORKERS: int = 0  # processes for batch rendering; 0 = one per CPU core
+    REPORT_TEMPLATE_CACHE_DIR: Optional[str] = None  # on-disk compiled-template cache
+    REPORT_CHUNK_SIZE: int = 500  # users per chunk streamed from the report query
+    REPORT_STREAK_LOOKBACK_DAYS: int = 60  # longest streak a report can show
     
     # Database (Optional)
     DATABASE_URL: Optional[str] = None
+    DATABASE_ASYNC: bool = False  # asyncio engine (aiosqlite / asyncpg) for async paths
+    DB_POOL_SIZE: int = 10  # server databases only
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a pooled connection
+    DB_POOL_RECYCLE: int = 1800  # seconds; reconnect before server-side idle timeouts
+    SQLITE_WAL: bool = True  # WAL journal + synchronous=NORMAL
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
 
 # Create global settings instance
 settings = Settings()
\ No newline at end of file
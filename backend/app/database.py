@@ -1,16 +1,93 @@
-from sqlalchemy import create_engine
+import asyncio
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from app.config import settings
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./focus_guardian.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Async drivers used when Settings.DATABASE_ASYNC is on
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def _engine_options(url) -> dict:
+    """Pool options per backend"""
+    if url.get_backend_name() == "sqlite":
+        # SQLAlchemy 2.0 pools SQLite file connections with QueuePool
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers run alongside the (single) writer, busy_timeout makes
+    a writer wait for the lock instead of failing, and synchronous=NORMAL
+    is durable enough under WAL while avoiding an fsync per commit.
+    """
+    cursor = dbapi_connection.cursor()
+    if settings.SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def create_db_engine(database_url: str = DATABASE_URL) -> Engine:
+    """Engine for ``database_url`` with pool settings / pragmas for its backend"""
+    url = make_url(database_url)
+    db_engine = create_engine(url, **_engine_options(url))
+    if url.get_backend_name() == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+def create_async_db_engine(database_url: str = DATABASE_URL):
+    """
+    AsyncEngine for ``database_url`` using its asyncio driver, or None when
+    the backend has none or the driver is not installed.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        print(f"⚠️ No async driver for {backend}; using the sync engine")
+        return None
+    try:
+        __import__(driver)
+    except ImportError:
+        print(f"⚠️ {driver} not installed; using the sync engine")
+        return None
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+    async_engine = create_async_engine(url.set(drivername=f"{backend}+{driver}"),
+                                       **_engine_options(url))
+    if backend == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return async_engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine() if settings.DATABASE_ASYNC else None
+AsyncSessionLocal = None
+if async_engine is not None:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -18,4 +95,53 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def _run_with_session(fn, args, kwargs):
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+async def run_in_session(fn, *args, **kwargs):
+    """
+    Run ``fn(db, *args, **kwargs)`` with a fresh session without blocking
+    the event loop: on the async engine when DATABASE_ASYNC is enabled
+    (AsyncSession.run_sync), else on a worker thread with a sync session.
+    ``fn`` is ordinary sync SQLAlchemy code; it commits itself if it writes
+    and should return plain values rather than ORM objects.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn, *args, **kwargs)
+    return await asyncio.to_thread(_run_with_session, fn, args, kwargs)
+
+async def dispose_engines():
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
+def ensure_indexes(db_engine: Engine = None):
+    """
+    Create indexes declared on tables that already existed (create_all()
+    only indexes the tables it creates itself)
+    """
+    db_engine = db_engine or engine
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db_engine, checkfirst=True)
+
+def upsert_insert(db, model):
+    """
+    INSERT for ``model`` that supports on_conflict_do_update(), or None when
+    the database dialect has no upsert support.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(model)
@@ -1,3 +1,5 @@
 from app.models.user import User
 from app.models.session import FocusSession
-from app.models.stats import Detection
+from app.models.stats import (
+    Detection, DetectionMinute, DetectionHour, DetectionStatus, UserStats
+)
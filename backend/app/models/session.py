@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -18,3 +18,8 @@ class FocusSession(Base):
     avg_score = Column(Float, default=0.0)
 
     user = relationship("User", backref="sessions")
+
+    __table_args__ = (
+        # Newest-first session history / keyset pagination for /api/sessions
+        Index("ix_focus_sessions_user_start_desc", user_id, start_time.desc(), id.desc()),
+    )
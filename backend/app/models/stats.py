@@ -1,16 +1,121 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+import enum
+
+from sqlalchemy import (
+    Column, Integer, BigInteger, SmallInteger, Float, DateTime, ForeignKey, Index
+)
+from sqlalchemy.orm import relationship, declared_attr
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 from app.database import Base
 
+
+class DetectionStatus(enum.IntEnum):
+    """Compact on-disk codes for detection statuses"""
+    ERROR = 0
+    FOCUSED = 1
+    DISTRACTED = 2
+    DROWSY = 3
+
+
+class StatusType(TypeDecorator):
+    """Stores status strings ("focused", ...) as a SMALLINT DetectionStatus code"""
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        return DetectionStatus.__members__.get(value.upper(), DetectionStatus.ERROR).value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        if isinstance(value, str):
+            # A legacy VARCHAR column not yet migrated by
+            # upgrade_detection_storage(): status names or numeric codes
+            if not value.isdigit():
+                return value
+            value = int(value)
+        return DetectionStatus(value).name.lower()
+
+
 class Detection(Base):
+    """
+    One row per processed frame. Stored compactly (SMALLINT status, 64-bit id)
+    and indexed by (session_id, timestamp) for per-session time-range scans.
+    On PostgreSQL the table can be partitioned by day, see
+    app/services/retention.py.
+    """
     __tablename__ = "detections"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
     session_id = Column(Integer, ForeignKey("focus_sessions.id"), nullable=False)
 
-    status = Column(String, nullable=False)
+    status = Column(StatusType, nullable=False)
     focus_score = Column(Float, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     session = relationship("FocusSession", backref="detections")
+
+    __table_args__ = (
+        Index("ix_detections_session_time", "session_id", "timestamp"),
+    )
+
+
+class FocusBucketMixin:
+    """Columns shared by the per-minute and per-hour focus rollups"""
+
+    @declared_attr
+    def session_id(cls):
+        return Column(Integer, ForeignKey("focus_sessions.id"), primary_key=True)
+
+    bucket_start = Column(DateTime, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+
+    focused = Column(Integer, default=0, nullable=False)
+    distracted = Column(Integer, default=0, nullable=False)
+    drowsy = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    score_min = Column(Float, nullable=True)
+    score_max = Column(Float, nullable=True)
+    ear_sum = Column(Float, default=0.0, nullable=False)
+    ear_count = Column(Integer, default=0, nullable=False)
+
+    @declared_attr
+    def __table_args__(cls):
+        return (Index(f"ix_{cls.__tablename__}_user_time", "user_id", "bucket_start"),)
+
+
+class DetectionMinute(FocusBucketMixin, Base):
+    """Per-minute focus rollup, maintained by the detection sink"""
+    __tablename__ = "detection_minutes"
+
+
+class DetectionHour(FocusBucketMixin, Base):
+    """Per-hour focus rollup, maintained by the detection sink"""
+    __tablename__ = "detection_hours"
+
+
+class UserStats(Base):
+    """Per-user rollup of all sessions, kept current by the detection sink"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    total_sessions = Column(Integer, default=0, nullable=False)
+    total_focused = Column(Integer, default=0, nullable=False)
+    total_distracted = Column(Integer, default=0, nullable=False)
+    total_drowsy = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Float, default=0.0, nullable=False)  # sum of detection scores
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def total_detections(self):
+        return self.total_focused + self.total_distracted + self.total_drowsy
+
+    @property
+    def avg_score(self):
+        """Detection-weighted average focus score"""
+        total = self.total_detections
+        return self.score_sum / total if total else 0.0
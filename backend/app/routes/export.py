@@ -0,0 +1,197 @@
+# Export Routes
+# File: backend/app/routes/export.py
+#
+# Streams a user's raw detections as CSV, NDJSON or Parquet. Rows are read
+# from a server-side cursor (yield_per) EXPORT_CHUNK_SIZE at a time and
+# encoded chunk by chunk, gzip-compressed on the fly when the client
+# accepts it, so memory per request stays constant however long the
+# history is. Rows come in (session_id, timestamp) order, which follows the
+# detections index and is chronological within each session.
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.auth import get_current_user
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User, FocusSession, Detection
+from app.routes.stats import to_naive_utc
+
+router = APIRouter(prefix="/api", tags=["Export"])
+
+EXPORT_COLUMNS = ("timestamp", "session_id", "status", "focus_score")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def iter_detection_chunks(user_id: int, start: Optional[datetime], end: Optional[datetime],
+                          chunk_size: int) -> Iterator[List[tuple]]:
+    """The user's detections in [start, end), ``chunk_size`` rows at a time"""
+    query = (
+        select(Detection.timestamp, Detection.session_id, Detection.status, Detection.focus_score)
+        .join(FocusSession, FocusSession.id == Detection.session_id)
+        .where(FocusSession.user_id == user_id)
+        .order_by(Detection.session_id, Detection.timestamp)
+    )
+    if start is not None:
+        query = query.where(Detection.timestamp >= start)
+    if end is not None:
+        query = query.where(Detection.timestamp < end)
+
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+# ==================== Encoders ====================
+
+def encode_csv(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        for timestamp, session_id, status, focus_score in chunk:
+            writer.writerow((timestamp.isoformat(), session_id, status, focus_score))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield "".join(
+            json.dumps({
+                "timestamp": timestamp.isoformat(),
+                "session_id": session_id,
+                "status": status,
+                "focus_score": focus_score,
+            }) + "\n"
+            for timestamp, session_id, status, focus_score in chunk
+        ).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes back to the response stream"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Rows buffered per Parquet row group; much smaller groups bloat the
+# file and slow readers down
+PARQUET_ROW_GROUP_ROWS = 65536
+
+
+def encode_parquet(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """Parquet streamed one row group at a time, as each is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("timestamp", pa.timestamp("us")),
+        ("session_id", pa.int32()),
+        ("status", pa.string()),
+        ("focus_score", pa.float32()),
+    ])
+
+    def row_group(rows):
+        columns = list(zip(*rows))
+        return pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        )
+
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+        rows: List[tuple] = []
+        for chunk in chunks:
+            rows.extend(chunk)
+            if len(rows) >= PARQUET_ROW_GROUP_ROWS:
+                writer.write_table(row_group(rows))
+                rows = []
+                yield sink.drain()
+        if rows:
+            writer.write_table(row_group(rows))
+    yield sink.drain()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+
+def gzip_stream(stream: Iterator[bytes], level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@router.get("/export")
+def export_detections(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the user's detection history (default: all of it)"""
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if format == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    stream = ENCODERS[format](iter_detection_chunks(
+        current_user.id, start, end, settings.EXPORT_CHUNK_SIZE
+    ))
+    filename = f"focus-detections-{current_user.username}.{format}"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Vary": "Accept-Encoding",
+    }
+    # Parquet pages are compressed already
+    if format != "parquet" and "gzip" in request.headers.get("accept-encoding", ""):
+        stream = gzip_stream(stream, settings.EXPORT_GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(stream, media_type=MEDIA_TYPES[format], headers=headers)
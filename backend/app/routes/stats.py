@@ -0,0 +1,161 @@
+# Stats Routes
+# File: backend/app/routes/stats.py
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_user
+from app.config import settings
+from app.database import run_in_session
+from app.models import User, FocusSession
+from app.services.rollups import get_timeline, session_summaries
+
+router = APIRouter(prefix="/api", tags=["Stats"])
+
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; normalise aware query params"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def session_timeline(db: Session, user_id: int, session_id: int, **options) -> Optional[dict]:
+    """Timeline of one of the user's sessions, or None if it is not theirs"""
+    session = db.query(FocusSession).filter(
+        FocusSession.id == session_id,
+        FocusSession.user_id == user_id
+    ).first()
+    if not session:
+        return None
+    
+    start = session.start_time
+    end = session.end_time or datetime.utcnow()
+    return get_timeline(db, user_id, start, end, session_id=session_id, **options)
+
+
+def encode_sessions_cursor(start_time: datetime, session_id: int) -> str:
+    return f"{start_time.isoformat()}_{session_id}"
+
+
+def decode_sessions_cursor(cursor: str):
+    try:
+        start_time, session_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(start_time), int(session_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def session_history_page(db: Session, user_id: int, after: Optional[tuple],
+                         limit: int, include_summary: bool = False):
+    """
+    One page of the user's sessions, newest first, and the cursor of the
+    next page. Keyset pagination on (start_time, id) walks the
+    (user_id, start_time DESC, id DESC) index, so a page costs the same
+    however deep into the history it is.
+    """
+    query = db.query(
+        FocusSession.id, FocusSession.start_time, FocusSession.end_time,
+        FocusSession.total_focused, FocusSession.total_distracted,
+        FocusSession.total_drowsy, FocusSession.avg_score
+    ).filter(FocusSession.user_id == user_id)
+    if after is not None:
+        last_start, last_id = after
+        query = query.filter(
+            (FocusSession.start_time < last_start) |
+            ((FocusSession.start_time == last_start) & (FocusSession.id < last_id))
+        )
+    rows = query.order_by(
+        FocusSession.start_time.desc(), FocusSession.id.desc()
+    ).limit(limit + 1).all()
+
+    page = rows[:limit]
+    summaries = session_summaries(db, [row.id for row in page]) if include_summary else {}
+    now = datetime.utcnow()
+    sessions = []
+    for row in page:
+        end = row.end_time or now
+        session = {
+            "id": row.id,
+            "start_time": row.start_time.isoformat() if row.start_time else None,
+            "end_time": row.end_time.isoformat() if row.end_time else None,
+            "active": row.end_time is None,
+            "duration_seconds": int((end - row.start_time).total_seconds()) if row.start_time else 0,
+            "total_focused": row.total_focused or 0,
+            "total_distracted": row.total_distracted or 0,
+            "total_drowsy": row.total_drowsy or 0,
+            "avg_score": round(row.avg_score or 0.0, 2)
+        }
+        if include_summary:
+            session["summary"] = summaries.get(row.id)
+        sessions.append(session)
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_sessions_cursor(last.start_time, last.id)
+    return sessions, next_cursor
+
+
+@router.get("/sessions")
+async def get_sessions(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    include_summary: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The user's focus sessions, newest first.
+
+    Returns one page; pass the X-Next-Cursor response header back as
+    ``cursor`` to fetch the next one. ``include_summary`` adds each
+    session's rollup summary (focus ratio, score range, average EAR).
+    """
+    after = decode_sessions_cursor(cursor) if cursor else None
+    sessions, next_cursor = await run_in_session(
+        session_history_page, current_user.id, after, limit, include_summary
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return sessions
+
+
+@router.get("/sessions/{session_id}/timeline")
+async def get_session_timeline(
+    session_id: int,
+    resolution: str = Query("auto", pattern="^(auto|minute|hour)$"),
+    max_points: int = Query(settings.TIMELINE_MAX_POINTS, ge=1, le=2000),
+    current_user: User = Depends(get_current_user)
+):
+    """Focus timeline of one session, served from minute/hour rollups"""
+    timeline = await run_in_session(
+        session_timeline, current_user.id, session_id,
+        resolution=resolution, max_points=max_points
+    )
+    if timeline is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return timeline
+
+
+@router.get("/timeline")
+async def get_user_timeline(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: str = Query("auto", pattern="^(auto|minute|hour)$"),
+    max_points: int = Query(settings.TIMELINE_MAX_POINTS, ge=1, le=2000),
+    current_user: User = Depends(get_current_user)
+):
+    """Focus timeline across all of the user's sessions (default: last 24 hours)"""
+    end = to_naive_utc(end) or datetime.utcnow()
+    start = to_naive_utc(start) or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    
+    return await run_in_session(
+        get_timeline, current_user.id, start, end,
+        resolution=resolution, max_points=max_points
+    )
@@ -0,0 +1,99 @@
+"""
+Per-connection frame admission
+File: backend/app/services/admission.py
+
+The WebSocket reader offers every received frame to the connection's
+FrameAdmission; a separate processing task takes frames from it. Only the
+newest unprocessed frame is kept (latest-frame-wins), so when inference
+falls behind, stale frames are dropped instead of queueing up. Frames are
+taken at most once per sampling interval. The interval stretches when the
+inference pool is loaded or when the user has been steadily focused, and is
+sent back to the client as the recommended capture interval.
+"""
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+# Totals across all connections (for metrics)
+totals = {"offered": 0, "processed": 0, "dropped": 0, "expired": 0}
+
+
+class FrameAdmission:
+    """Latest-frame-wins slot with an adaptive sampling interval"""
+
+    def __init__(self, base_interval: float = 0.5, max_interval: float = 4.0,
+                 max_age: float = 5.0, stable_frames: int = 5):
+        self.base_interval = base_interval
+        self.max_interval = max(max_interval, base_interval)
+        self.max_age = max_age
+        self.stable_frames = stable_frames
+
+        self._pending: Optional[Tuple[object, Optional[int], float]] = None
+        self._available = asyncio.Event()
+        self._last_taken = 0.0
+
+        self._last_status: Optional[str] = None
+        self._streak = 0
+        self._load = 0.0
+
+        self.offered = 0
+        self.dropped = 0
+
+    def offer(self, image_bytes, frame_id: Optional[int] = None):
+        """Accept a received frame, replacing (dropping) any unprocessed one"""
+        self.offered += 1
+        totals["offered"] += 1
+        if self._pending is not None:
+            self.dropped += 1
+            totals["dropped"] += 1
+        self._pending = (image_bytes, frame_id, time.monotonic())
+        self._available.set()
+
+    async def next_frame(self) -> Tuple[object, Optional[int]]:
+        """Wait for the sampling interval, then return the newest frame"""
+        while True:
+            wait = self._last_taken + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            await self._available.wait()
+            self._available.clear()
+            image_bytes, frame_id, received = self._pending
+            self._pending = None
+
+            if time.monotonic() - received > self.max_age:
+                totals["expired"] += 1
+                continue
+
+            self._last_taken = time.monotonic()
+            totals["processed"] += 1
+            return image_bytes, frame_id
+
+    def record(self, status: str, load: float = 0.0):
+        """
+        Feed back a detection result and the current inference load
+        (queue depth per worker) to adapt the sampling interval.
+        """
+        if status == self._last_status:
+            self._streak += 1
+        else:
+            self._last_status = status
+            self._streak = 1
+        self._load = max(load, 0.0)
+
+    @property
+    def interval(self) -> float:
+        """Current sampling interval in seconds"""
+        interval = self.base_interval * (1.0 + self._load)
+        if self._last_status == "focused" and self._streak >= self.stable_frames:
+            # Double per `stable_frames` further focused frames
+            steps = self._streak // self.stable_frames
+            interval *= 2 ** min(steps, 4)
+        return min(interval, self.max_interval)
+
+    def get_stats(self) -> Dict:
+        return {
+            "offered": self.offered,
+            "dropped": self.dropped,
+            "interval_ms": int(self.interval * 1000)
+        }
@@ -0,0 +1,125 @@
+"""
+User statistics rollup
+File: backend/app/services/analytics.py
+
+/api/stats reads one user_stats row instead of summing every FocusSession.
+The row is updated incrementally: a session is counted when it starts and
+detection counts/scores are added whenever the detection sink flushes.
+rebuild_user_stats() recomputes the table from focus_sessions, and
+backfill_user_stats() (run at startup) fills in users who have sessions
+but no row yet, e.g. after upgrading from a release without the rollup.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, delete, exists, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.database import upsert_insert
+from app.models import FocusSession, UserStats
+
+ROLLUP_COLUMNS = ("total_sessions", "total_focused", "total_distracted",
+                  "total_drowsy", "score_sum")
+
+
+def add_user_stats(db: Session, user_id: int, **deltas):
+    """
+    Add deltas (any of ROLLUP_COLUMNS) to a user's rollup row, creating it
+    if needed. Does not commit.
+    """
+    values = {column: deltas.get(column, 0) for column in ROLLUP_COLUMNS}
+    table = UserStats.__table__
+
+    stmt = upsert_insert(db, UserStats)
+    if stmt is not None:
+        stmt = stmt.values(user_id=user_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                **{column: table.c[column] + stmt.excluded[column] for column in ROLLUP_COLUMNS},
+                "updated_at": datetime.utcnow(),
+            }
+        )
+        db.execute(stmt)
+        return
+
+    result = db.execute(
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values({column: table.c[column] + value for column, value in values.items()})
+    )
+    if result.rowcount == 0:
+        db.execute(insert(UserStats).values(user_id=user_id, **values))
+
+
+def get_user_stats(db: Session, user_id: int) -> Dict:
+    """Totals and detection-weighted average score for one user"""
+    stats: Optional[UserStats] = db.get(UserStats, user_id)
+    if stats is None:
+        return {
+            "total_sessions": 0,
+            "total_focused": 0,
+            "total_distracted": 0,
+            "total_drowsy": 0,
+            "avg_score": 0.0
+        }
+    return {
+        "total_sessions": stats.total_sessions,
+        "total_focused": stats.total_focused,
+        "total_distracted": stats.total_distracted,
+        "total_drowsy": stats.total_drowsy,
+        "avg_score": stats.avg_score
+    }
+
+
+def _session_totals():
+    """Per-user rollup columns aggregated from focus_sessions"""
+    detections = (FocusSession.total_focused +
+                  FocusSession.total_distracted +
+                  FocusSession.total_drowsy)
+    return select(
+        FocusSession.user_id,
+        func.count(FocusSession.id),
+        func.coalesce(func.sum(FocusSession.total_focused), 0),
+        func.coalesce(func.sum(FocusSession.total_distracted), 0),
+        func.coalesce(func.sum(FocusSession.total_drowsy), 0),
+        func.coalesce(func.sum(FocusSession.avg_score * detections), 0.0),
+    ).group_by(FocusSession.user_id)
+
+
+def rebuild_user_stats(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recompute user_stats from focus_sessions with one aggregate query.
+
+    Rebuilds every user, or only ``user_id`` when given. Returns the number
+    of rollup rows written. Commits.
+    """
+    aggregate = _session_totals()
+
+    clear = delete(UserStats)
+    if user_id is not None:
+        aggregate = aggregate.where(FocusSession.user_id == user_id)
+        clear = clear.where(UserStats.user_id == user_id)
+
+    db.execute(clear)
+    result = db.execute(
+        insert(UserStats).from_select(["user_id", *ROLLUP_COLUMNS], aggregate)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def backfill_user_stats(db: Session) -> int:
+    """
+    Create the rollup row of every user who has sessions but none yet.
+    Existing rows are left alone. Returns the number of rows written.
+    Commits.
+    """
+    aggregate = _session_totals().where(
+        ~exists().where(UserStats.user_id == FocusSession.user_id)
+    )
+    result = db.execute(
+        insert(UserStats).from_select(["user_id", *ROLLUP_COLUMNS], aggregate)
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,207 @@
+"""
+Buffered detection writer
+File: backend/app/services/detection_sink.py
+
+Instead of two commits per frame, the WebSocket path hands each detection
+to the sink. The sink buffers Detection rows and per-user counter deltas
+and writes them in one transaction (a bulk INSERT plus the user_stats and
+minute/hour rollups) when the batch is full, when the flush interval elapses, or when
+a caller asks for a flush (e.g. on disconnect). The queue is bounded, so
+producers wait instead of growing memory when the database falls behind.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import FocusSession, Detection
+from app.services.analytics import add_user_stats
+from app.services.rollups import apply_rollups
+from app.utils.logger import log_sampled
+from app.utils.metrics import STAGE_SECONDS, DB_FLUSH_ROWS
+
+COUNTED_STATUSES = ("focused", "distracted", "drowsy")
+
+_TIMED_OUT = object()
+
+
+class DetectionSink:
+    """Asynchronous, batching writer for detections and user counters"""
+
+    def __init__(self, session_factory: Callable[[], Session], max_queue: int = 5000,
+                 flush_size: int = 200, flush_interval: float = 2.0):
+        self.session_factory = session_factory
+        self.max_queue = max_queue
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._getter: Optional[asyncio.Future] = None
+
+        # Metrics
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.flushes = 0
+        self.last_flush_size = 0
+        self.last_flush_ms = 0.0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write everything still buffered and stop the writer task"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def put(self, session_id: int, status: str, focus_score: float,
+                  timestamp: Optional[datetime] = None, ear: Optional[float] = None):
+        """Queue one detection; waits while the queue is full"""
+        await self._queue.put({
+            "session_id": session_id,
+            "status": status,
+            "focus_score": focus_score,
+            "timestamp": timestamp or datetime.utcnow(),
+            "ear": ear
+        })
+
+    async def flush(self):
+        """Wait until every detection queued so far has been written"""
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(done)
+        await done
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            rows, waiters, stopping = await self._collect()
+            if rows:
+                await asyncio.to_thread(self._write, rows)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def _collect(self):
+        """Gather one batch: up to flush_size rows or flush_interval seconds"""
+        rows: List[Dict] = []
+        waiters: List[asyncio.Future] = []
+
+        item = await self._next(None)
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is None:
+                return rows, waiters, True
+            if isinstance(item, asyncio.Future):
+                waiters.append(item)
+                return rows, waiters, False
+
+            rows.append(item)
+            if len(rows) >= self.flush_size:
+                return rows, waiters, False
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return rows, waiters, False
+            item = await self._next(remaining)
+            if item is _TIMED_OUT:
+                return rows, waiters, False
+
+    async def _next(self, timeout: Optional[float]):
+        # The pending get survives a timeout and is reused by the next batch,
+        # so an item is never lost to a cancelled get
+        if self._getter is None:
+            self._getter = asyncio.ensure_future(self._queue.get())
+        done, _ = await asyncio.wait({self._getter}, timeout=timeout)
+        if not done:
+            return _TIMED_OUT
+        item = self._getter.result()
+        self._getter = None
+        return item
+
+    def _write(self, rows: List[Dict]):
+        """Bulk insert a batch and apply its user counter deltas (worker thread)"""
+        started = time.perf_counter()
+
+        db = self.session_factory()
+        try:
+            owners = dict(
+                db.query(FocusSession.id, FocusSession.user_id)
+                .filter(FocusSession.id.in_({row["session_id"] for row in rows}))
+                .all()
+            )
+            # Rows of a session that no longer exists would fail the whole
+            # batch; drop just those
+            known = [row for row in rows if row["session_id"] in owners]
+            if len(known) < len(rows):
+                unknown = sorted({row["session_id"] for row in rows} - set(owners))
+                self.rows_failed += len(rows) - len(known)
+                log_sampled("sink-unknown-session",
+                            f"⚠️ Dropping {len(rows) - len(known)} detections of unknown sessions {unknown}")
+                rows = known
+            if not rows:
+                return
+
+            deltas: Dict[int, Dict] = {}
+            for row in rows:
+                if row["status"] not in COUNTED_STATUSES:
+                    continue
+                delta = deltas.setdefault(row["session_id"], {
+                    "focused": 0, "distracted": 0, "drowsy": 0, "count": 0, "score_sum": 0.0
+                })
+                delta[row["status"]] += 1
+                delta["count"] += 1
+                delta["score_sum"] += row["focus_score"]
+
+            db.execute(insert(Detection), [
+                {key: value for key, value in row.items() if key != "ear"}
+                for row in rows
+            ])
+
+            # Session totals are checkpointed by LiveSessionTracker; roll
+            # the deltas up into each owner's user_stats row
+            user_deltas: Dict[int, Dict] = {}
+            for session_id, delta in deltas.items():
+                user_delta = user_deltas.setdefault(owners[session_id], {
+                    "total_focused": 0, "total_distracted": 0, "total_drowsy": 0, "score_sum": 0.0
+                })
+                user_delta["total_focused"] += delta["focused"]
+                user_delta["total_distracted"] += delta["distracted"]
+                user_delta["total_drowsy"] += delta["drowsy"]
+                user_delta["score_sum"] += delta["score_sum"]
+            for user_id, user_delta in user_deltas.items():
+                add_user_stats(db, user_id, **user_delta)
+
+            apply_rollups(db, rows, owners)
+
+            db.commit()
+            self.rows_written += len(rows)
+        except Exception as e:
+            db.rollback()
+            self.rows_failed += len(rows)
+            print(f"❌ Detection flush failed ({len(rows)} rows): {e}")
+        finally:
+            db.close()
+
+        self.flushes += 1
+        self.last_flush_size = len(rows)
+        self.last_flush_ms = (time.perf_counter() - started) * 1000.0
+        STAGE_SECONDS.observe(self.last_flush_ms / 1000.0, stage="db_flush")
+        DB_FLUSH_ROWS.observe(len(rows))
+
+    def get_stats(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "flushes": self.flushes,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
@@ -1,10 +1,79 @@
+import math
 import cv2
 import numpy as np
-from typing import Dict
+from typing import Dict, Optional, Tuple
 import time
 
+from app.config import settings
+from app.services.focus_state import FocusStateMachine
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                     0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG header without decoding, or None"""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+# Average face geometry (arbitrary units, camera axes: x right, y down,
+# z away from the camera) at the POSE_ANCHORS landmarks, in order: nose
+# tip, chin, eye outer corners (image left, right), mouth corners. Depths
+# follow FaceMesh's own estimates; landmark 152 sits under the jaw, well
+# behind the nose tip.
+POSE_MODEL_POINTS = np.array([
+    [0.0, 0.0, 0.0],
+    [0.0, 330.0, 190.0],
+    [-225.0, -210.0, 205.0],
+    [225.0, -210.0, 205.0],
+    [-135.0, 125.0, 180.0],
+    [135.0, 125.0, 180.0],
+], dtype=np.float64)
+
+
 class FocusDetector:
-    def __init__(self):
+    def __init__(self, max_dim: Optional[int] = None, roi_padding: Optional[float] = None):
+        # Frames wider/taller than 2x/4x max_dim are decoded at 1/2 or 1/4 size
+        self.max_dim = max_dim if max_dim is not None else settings.DETECTION_MAX_DIM
+        self.roi_padding = roi_padding if roi_padding is not None else settings.DETECTION_ROI_PADDING
+        
+        # Padded face region of the previous frame (x0, y0, x1, y1), searched
+        # first on the next frame; None means search the whole frame
+        self._roi: Optional[Tuple[int, int, int, int]] = None
+        self._frame_shape = None
+        # Region FaceMesh last ran on; its tracking state is only valid there
+        self._tracked_region: Optional[Tuple[int, int, int, int]] = None
+        
+        # Head pose: yaw/pitch beyond this many degrees is "looking away".
+        # Camera matrices are cached per frame size.
+        self.head_pose_threshold = settings.HEAD_POSE_THRESHOLD
+        self._cameras: Dict[Tuple[int, int], np.ndarray] = {}
+        self._dist_coeffs = np.zeros((4, 1))
+        
+        # Seeded mock results when MediaPipe is unavailable
+        self._synthetic = None
+        
+        # Smoothed status used when detect_focus() is not given the
+        # session's own (the executor keeps one per session, outside the
+        # detector pool, so it survives detector eviction)
+        self.state = FocusStateMachine()
+        
         try:
             import mediapipe as mp
             self.mp_face_mesh = mp.solutions.face_mesh
@@ -24,24 +93,176 @@ class FocusDetector:
         # Eye landmark indices
         self.LEFT_EYE = [362, 385, 387, 263, 373, 380]
         self.RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+        
+        # Only these landmarks are copied out of the 478 FaceMesh returns:
+        # both eyes (rows 0-11), iris centres, head-pose anchors (nose tip,
+        # chin, eye outer corners, mouth corners), then the face outline
+        # extremes (forehead, chin, cheeks) used for the ROI
+        self.IRIS_CENTERS = [468, 473]
+        self.POSE_ANCHORS = [1, 152, 33, 263, 61, 291]
+        self.FACE_BOUNDS = [10, 152, 234, 454]
+        self.LANDMARK_INDICES = (self.LEFT_EYE + self.RIGHT_EYE + self.IRIS_CENTERS +
+                                 self.POSE_ANCHORS + self.FACE_BOUNDS)
+        self.EYES = slice(0, 12)
+        self.IRIS = slice(12, 14)
+        self.POSE = slice(14, 20)
+        self.BOUNDS = slice(20, 24)
+        self._points = np.empty((len(self.LANDMARK_INDICES), 2), dtype=np.float64)
     
     def calculate_ear(self, eye_landmarks):
         """Calculate Eye Aspect Ratio for drowsiness detection"""
         try:
-            A = np.linalg.norm(eye_landmarks[1] - eye_landmarks[5])
-            B = np.linalg.norm(eye_landmarks[2] - eye_landmarks[4])
-            C = np.linalg.norm(eye_landmarks[0] - eye_landmarks[3])
-            ear = (A + B) / (2.0 * C)
-            return ear
+            return float(self.calculate_ears(np.asarray(eye_landmarks)[np.newaxis])[0])
         except:
             return 0.3
     
-    def detect_focus(self, image_data: bytes) -> Dict:
-        """Main detection function"""
+    @staticmethod
+    def calculate_ears(eyes: np.ndarray) -> np.ndarray:
+        """
+        Eye Aspect Ratio of several eyes at once.
+        
+        ``eyes`` has shape (n_eyes, 6, 2) in the LEFT_EYE/RIGHT_EYE point order.
+        """
+        # Vertical pairs (1,5), (2,4) and the horizontal pair (0,3)
+        d = np.linalg.norm(eyes[:, [1, 2, 0]] - eyes[:, [5, 4, 3]], axis=2)
+        return (d[:, 0] + d[:, 1]) / (2.0 * d[:, 2])
+    
+    def extract_landmarks(self, face_landmarks, w: int, h: int,
+                          offset: Tuple[int, int] = (0, 0)) -> np.ndarray:
+        """
+        Copy the needed landmarks (LANDMARK_INDICES) into a preallocated
+        (n, 2) pixel-coordinate array, reused between frames. ``w``/``h``
+        are the size of the image FaceMesh saw and ``offset`` its position
+        in the full frame (for ROI crops).
+        """
+        points = self._points
+        landmark = face_landmarks.landmark
+        for row, index in enumerate(self.LANDMARK_INDICES):
+            point = landmark[index]
+            points[row, 0] = point.x
+            points[row, 1] = point.y
+        points *= (w, h)
+        points += offset
+        return points
+    
+    def decode_image(self, image_data) -> Optional[np.ndarray]:
+        """Decode a frame, at 1/2 or 1/4 resolution when it is much larger than max_dim"""
+        nparr = np.frombuffer(image_data, np.uint8)
+        flag = cv2.IMREAD_COLOR
+        size = jpeg_size(nparr)
+        if size is not None:
+            largest = max(size)
+            if largest >= 4 * self.max_dim:
+                flag = cv2.IMREAD_REDUCED_COLOR_4
+            elif largest >= 2 * self.max_dim:
+                flag = cv2.IMREAD_REDUCED_COLOR_2
+        return cv2.imdecode(nparr, flag)
+    
+    def _find_face(self, image: np.ndarray):
+        """
+        Run FaceMesh on the remembered face ROI, falling back to the whole
+        frame when there is no ROI or the face left it.
+        
+        Returns (results, (x0, y0), (w, h)) of the region that was searched.
+        """
+        if image.shape != self._frame_shape:
+            self._frame_shape = image.shape
+            self._roi = None
+        
+        if self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            crop = cv2.cvtColor(image[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+            results = self._process(crop, self._roi)
+            if results.multi_face_landmarks:
+                return results, (x0, y0), (x1 - x0, y1 - y0)
+            self._roi = None
+        
+        h, w = image.shape[:2]
+        results = self._process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), (0, 0, w, h))
+        return results, (0, 0), (w, h)
+    
+    def _process(self, rgb: np.ndarray, region: Tuple[int, int, int, int]):
+        """
+        FaceMesh on ``rgb``, the ``region`` (x0, y0, x1, y1) of the frame.
+        Tracking carries the previous face position over in the previous
+        input's normalized coordinates, which mean something else in a
+        different region, so the graph is reset whenever the region changes.
+        """
+        if region != self._tracked_region:
+            self.face_mesh.reset()
+            self._tracked_region = region
+        return self.face_mesh.process(rgb)
+    
+    def _update_roi(self, bounds: np.ndarray, w: int, h: int):
+        """Keep the ROI while the face stays well inside it, else re-centre it"""
+        fx0, fy0 = bounds.min(axis=0)
+        fx1, fy1 = bounds.max(axis=0)
+        if self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            margin_x = (x1 - x0) * 0.1
+            margin_y = (y1 - y0) * 0.1
+            if (fx0 > x0 + margin_x and fx1 < x1 - margin_x and
+                    fy0 > y0 + margin_y and fy1 < y1 - margin_y):
+                return
+        
+        pad_x = (fx1 - fx0) * self.roi_padding
+        pad_y = (fy1 - fy0) * self.roi_padding
+        x0 = max(int(fx0 - pad_x), 0)
+        y0 = max(int(fy0 - pad_y), 0)
+        x1 = min(int(fx1 + pad_x) + 1, w)
+        y1 = min(int(fy1 + pad_y) + 1, h)
+        
+        # A crop covering most of the frame saves nothing
+        if (x1 - x0) * (y1 - y0) > 0.8 * w * h:
+            self._roi = None
+        else:
+            self._roi = (x0, y0, x1, y1)
+    
+    def _camera_matrix(self, w: int, h: int) -> np.ndarray:
+        """Pinhole approximation: focal length = frame width, centred"""
+        camera = self._cameras.get((w, h))
+        if camera is None:
+            if len(self._cameras) >= 8:
+                self._cameras.clear()
+            camera = np.array([[w, 0, w / 2],
+                               [0, w, h / 2],
+                               [0, 0, 1]], dtype=np.float64)
+            self._cameras[(w, h)] = camera
+        return camera
+    
+    def estimate_head_pose(self, points: np.ndarray, w: int, h: int) -> Optional[Tuple[float, float, float]]:
+        """
+        (yaw, pitch, roll) in degrees from the POSE_ANCHORS pixel
+        coordinates of a ``w`` x ``h`` frame, or None if solvePnP fails.
+        """
+        # SQPnP finds the global minimum without an initial guess, and
+        # measured faster than iterative refinement seeded with the previous
+        # frame's pose (benchmarks/bench_head_pose.py)
+        ok, rvec, tvec = cv2.solvePnP(POSE_MODEL_POINTS, points, self._camera_matrix(w, h),
+                                      self._dist_coeffs, flags=cv2.SOLVEPNP_SQPNP)
+        if not ok or tvec[2, 0] <= 0:
+            return None
+        
+        rotation, _ = cv2.Rodrigues(rvec)
+        yaw = math.degrees(math.atan2(-rotation[2, 0], math.hypot(rotation[0, 0], rotation[1, 0])))
+        pitch = math.degrees(math.atan2(rotation[2, 1], rotation[2, 2]))
+        roll = math.degrees(math.atan2(rotation[1, 0], rotation[0, 0]))
+        return yaw, pitch, roll
+    
+    def close(self):
+        """Release the FaceMesh graph held by this detector"""
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
+    
+    def detect_focus(self, image_data: bytes, state: Optional[FocusStateMachine] = None) -> Dict:
+        """
+        Main detection function. ``state`` is the session's smoothing state
+        machine (default: this detector's own).
+        """
         try:
-            # Convert bytes to image
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Convert bytes to image (downscaled when the frame is large)
+            image = self.decode_image(image_data)
             
             if image is None:
                 return {
@@ -54,9 +275,8 @@ class FocusDetector:
             if not self.mp_available or self.face_mesh is None:
                 return self._generate_realistic_detection()
             
-            # Process with MediaPipe
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.face_mesh.process(image_rgb)
+            # Process with MediaPipe, on the last face ROI when there is one
+            results, offset, (roi_w, roi_h) = self._find_face(image)
             
             if not results.multi_face_landmarks:
                 return {
@@ -69,42 +289,29 @@ class FocusDetector:
             face_landmarks = results.multi_face_landmarks[0]
             h, w = image.shape[:2]
             
-            landmarks = []
-            for landmark in face_landmarks.landmark:
-                landmarks.append([landmark.x * w, landmark.y * h])
-            landmarks = np.array(landmarks)
-            
-            # Calculate EAR for both eyes
-            left_eye = np.array([landmarks[i] for i in self.LEFT_EYE])
-            right_eye = np.array([landmarks[i] for i in self.RIGHT_EYE])
-            
-            left_ear = self.calculate_ear(left_eye)
-            right_ear = self.calculate_ear(right_eye)
-            avg_ear = (left_ear + right_ear) / 2.0
+            landmarks = self.extract_landmarks(face_landmarks, roi_w, roi_h, offset)
+            self._update_roi(landmarks[self.BOUNDS], w, h)
             
-            # Determine status based on EAR
-            focus_score = 85
-            status = "focused"
+            # Calculate EAR for both eyes in one pass
+            ears = self.calculate_ears(landmarks[self.EYES].reshape(2, 6, 2))
+            avg_ear = float(ears.mean())
             
-            # Check for drowsiness (eyes closing)
-            if avg_ear < 0.2:
-                focus_score = 40
-                status = "drowsy"
-            # Check for moderate distraction
-            elif avg_ear < 0.23:
-                focus_score = 65
-                status = "distracted"
-            # Good focus
-            else:
-                focus_score = 85
-                status = "focused"
+            # Head pose: eyes open but looking away still counts as distracted
+            pose = self.estimate_head_pose(landmarks[self.POSE], w, h)
+            looking_away = pose is not None and max(abs(pose[0]), abs(pose[1])) > self.head_pose_threshold
             
-            return {
-                "status": status,
-                "focus_score": int(focus_score),
-                "timestamp": time.time(),
-                "ear": float(avg_ear)
-            }
+            # Smooth EAR over time: blinks, PERCLOS and hysteresis
+            state = state if state is not None else self.state
+            result = state.update(avg_ear, time.monotonic(), looking_away)
+            result["timestamp"] = time.time()
+            result["ear"] = avg_ear
+            if pose is not None:
+                result["head_pose"] = {
+                    "yaw": round(pose[0], 1),
+                    "pitch": round(pose[1], 1),
+                    "roll": round(pose[2], 1)
+                }
+            return result
             
         except Exception as e:
             print(f"⚠️ Detection error: {e}")
@@ -112,23 +319,7 @@ class FocusDetector:
     
     def _generate_realistic_detection(self) -> Dict:
         """Generate realistic mock detection when MediaPipe fails"""
-        import random
-        
-        # Generate more realistic patterns
-        rand = random.random()
-        
-        if rand < 0.7:  # 70% focused
-            status = "focused"
-            score = random.randint(75, 95)
-        elif rand < 0.85:  # 15% distracted
-            status = "distracted"
-            score = random.randint(40, 65)
-        else:  # 15% drowsy
-            status = "drowsy"
-            score = random.randint(30, 50)
-        
-        return {
-            "status": status,
-            "focus_score": score,
-            "timestamp": time.time()
-        }
\ No newline at end of file
+        if self._synthetic is None:
+            from app.services.synthetic_detector import SyntheticDetector
+            self._synthetic = SyntheticDetector(latency_ms=0, decode=False)
+        return self._synthetic.generate()
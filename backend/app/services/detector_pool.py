@@ -0,0 +1,132 @@
+"""
+Detector pool
+File: backend/app/services/detector_pool.py
+
+FaceMesh runs in tracking mode and keeps state between frames, so a single
+instance must never be shared by two sessions at once. The pool leases one
+FocusDetector per session: consecutive frames of the same session reuse the
+same instance (and therefore the cheaper tracking path), idle detectors are
+evicted least-recently-used first, and the total is capped.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.detector import FocusDetector
+
+
+def create_detector():
+    """Build a detector for the configured backend (Settings.DETECTOR_BACKEND)"""
+    if settings.DETECTOR_BACKEND == "synthetic":
+        from app.services.synthetic_detector import SyntheticDetector
+        return SyntheticDetector()
+    return FocusDetector()
+
+
+class DetectorPool:
+    """Bounded, thread-safe LRU pool of per-session detectors"""
+
+    def __init__(self, max_size: int = 32, factory: Callable[[], FocusDetector] = create_detector):
+        self.max_size = max(1, max_size)
+        self.factory = factory
+
+        # key -> detector, least recently used first
+        self._detectors: "OrderedDict[object, FocusDetector]" = OrderedDict()
+        self._leased = set()
+        self._cond = threading.Condition()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, key: object) -> Tuple[FocusDetector, bool]:
+        """
+        Lease the detector for ``key``, creating one if needed.
+
+        Returns the detector and whether it was reused from an earlier frame.
+
+        Blocks while the key is already leased or while the pool is full of
+        leased detectors.
+        """
+        evicted = None
+        with self._cond:
+            while True:
+                if key in self._leased:
+                    self._cond.wait()
+                    continue
+
+                detector = self._detectors.get(key)
+                if detector is not None:
+                    self._detectors.move_to_end(key)
+                    self._leased.add(key)
+                    self.hits += 1
+                    return detector, True
+
+                if len(self._detectors) < self.max_size:
+                    break
+
+                evicted = self._pop_idle()
+                if evicted is not None:
+                    break
+                self._cond.wait()
+
+            self.misses += 1
+            self._leased.add(key)
+            # Reserve the slot before building the detector outside the lock
+            self._detectors[key] = None
+
+        if evicted is not None:
+            evicted.close()
+
+        try:
+            detector = self.factory()
+        except Exception:
+            with self._cond:
+                del self._detectors[key]
+                self._leased.discard(key)
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._detectors[key] = detector
+        return detector, False
+
+    def release(self, key: object):
+        """Return a leased detector to the pool"""
+        with self._cond:
+            self._leased.discard(key)
+            self._cond.notify_all()
+
+    def evict(self, key: object):
+        """Drop the detector of a finished session"""
+        with self._cond:
+            if key in self._leased:
+                return
+            detector = self._detectors.pop(key, None)
+            if detector is not None:
+                self.evictions += 1
+            self._cond.notify_all()
+        if detector is not None:
+            detector.close()
+
+    def _pop_idle(self) -> Optional[FocusDetector]:
+        """Remove and return the least recently used idle detector"""
+        for key, detector in self._detectors.items():
+            if key not in self._leased and detector is not None:
+                del self._detectors[key]
+                self.evictions += 1
+                return detector
+        return None
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return {
+                "size": len(self._detectors),
+                "max_size": self.max_size,
+                "leased": len(self._leased),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,189 @@
+"""
+Streaming focus classifier
+File: backend/app/services/focus_state.py
+
+Turns the per-frame eye aspect ratio (EAR) of one session into a stable
+status instead of thresholding every frame on its own:
+
+- EMA of EAR, so a single noisy frame barely moves the estimate
+- the sampling interval is measured (EMA of the time between samples),
+  and every duration-based rule is expressed in samples at that rate
+- blink detection: an eye closure that reopens within BLINK_MAX_DURATION
+  is counted as a blink, not as drowsiness. Only possible when samples
+  come at least twice per BLINK_MAX_DURATION; otherwise blinks are
+  reported as None rather than as 0
+- PERCLOS (fraction of samples with closed eyes) over a sliding time
+  window, kept in a fixed-size ring buffer; None until the samples cover
+  enough of the window to mean something
+- drowsiness from a closure spanning DROWSY_CLOSURE_SECONDS (and at least
+  DROWSY_CLOSED_SAMPLES closed samples in a row), or a high PERCLOS; a
+  shorter closure in progress leaves the status as it is
+- "distracted" while the head is turned away (see FocusDetector head pose)
+- hysteresis: a new status must hold for STATUS_HOLD_FRAMES frames before
+  it is reported (a sustained closure switches to "drowsy" immediately),
+  and leaving "drowsy" needs PERCLOS to fall below a lower exit threshold
+"""
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.config import settings
+
+STATUS_SCORES = {"focused": 85, "distracted": 65, "drowsy": 40}
+
+
+class FocusStateMachine:
+    """Per-session EAR smoother and status state machine"""
+
+    def __init__(self, capacity: int = 1024, min_samples: int = 10):
+        self.alpha = settings.EAR_SMOOTHING
+        self.closed_threshold = settings.EAR_CLOSED_THRESHOLD
+        self.low_threshold = settings.EAR_LOW_THRESHOLD
+        self.blink_max = settings.BLINK_MAX_DURATION
+        self.drowsy_closure = settings.DROWSY_CLOSURE_SECONDS
+        self.drowsy_min_samples = max(1, settings.DROWSY_CLOSED_SAMPLES)
+        self.perclos_window = settings.PERCLOS_WINDOW
+        self.perclos_enter = settings.PERCLOS_DROWSY
+        self.perclos_exit = settings.PERCLOS_RECOVER
+        self.hold = max(1, settings.STATUS_HOLD_FRAMES)
+        # PERCLOS over fewer samples than this is too noisy to act on
+        self.min_samples = min_samples
+
+        # Ring buffer of (sample time, eyes closed)
+        self._times = np.full(capacity, -np.inf)
+        self._closed = np.zeros(capacity, dtype=bool)
+        self._next = 0
+
+        self.ear_ema: Optional[float] = None
+        self._closed_since: Optional[float] = None
+        self._closed_run = 0  # closed samples in a row
+        self.blinks = 0
+
+        # Measured time between samples (EMA), None until the second sample
+        self.interval: Optional[float] = None
+        self._last_time: Optional[float] = None
+
+        self.status = "focused"
+        self._candidate: Optional[str] = None
+        self._candidate_frames = 0
+        self.transitions = 0
+
+    def _push(self, now: float, closed: bool):
+        self._times[self._next] = now
+        self._closed[self._next] = closed
+        self._next = (self._next + 1) % len(self._times)
+
+    def perclos(self, now: float) -> Optional[float]:
+        """
+        Fraction of samples within the window taken with closed eyes, or
+        None while the window holds fewer than ``min_samples`` samples or
+        the samples span less than half of it (a few seconds of history
+        would make one closure look like chronic drowsiness)
+        """
+        in_window = self._times >= now - self.perclos_window
+        count = np.count_nonzero(in_window)
+        if count < self.min_samples:
+            return None
+        if now - self._times[in_window].min() < self.perclos_window / 2:
+            return None
+        return np.count_nonzero(self._closed & in_window) / count
+
+    @property
+    def blinks_observable(self) -> bool:
+        """Whether samples come often enough to tell a blink from a closure"""
+        return self.interval is not None and self.interval * 2 <= self.blink_max
+
+    @property
+    def drowsy_samples(self) -> int:
+        """Closed samples in a row that make a drowsy closure at this rate"""
+        if self.interval is None or self.interval <= 0:
+            return self.drowsy_min_samples
+        # The closure spans (n - 1) intervals between its first and last sample
+        # (rounded first, so timestamp jitter does not add a whole sample)
+        spans = math.ceil(round(self.drowsy_closure / self.interval, 3))
+        return max(self.drowsy_min_samples, spans + 1)
+
+    def _classify(self, sustained_closure: bool, perclos: Optional[float],
+                  looking_away: bool) -> str:
+        if sustained_closure or (perclos is not None and perclos >= self.perclos_enter):
+            return "drowsy"
+        if self.status == "drowsy" and (perclos is None or perclos > self.perclos_exit):
+            return "drowsy"
+        if self._closed_run:
+            # A closure still too short to call: a blink, or drowsiness
+            # that is not confirmed yet; judge it once it ends or lasts
+            return self.status
+        if self.ear_ema < self.closed_threshold:
+            return "drowsy"
+        if looking_away:
+            return "distracted"
+        if self.ear_ema < self.low_threshold:
+            return "distracted"
+        return "focused"
+
+    def _track_interval(self, now: float):
+        if self._last_time is not None:
+            elapsed = now - self._last_time
+            # Pauses longer than the PERCLOS window are gaps, not the rate
+            if 0 < elapsed <= self.perclos_window:
+                if self.interval is None:
+                    self.interval = elapsed
+                else:
+                    self.interval += self.alpha * (elapsed - self.interval)
+        self._last_time = now
+
+    def update(self, ear: float, now: float, looking_away: bool = False) -> Dict:
+        """
+        Feed one EAR sample taken at ``now`` (monotonic seconds), and whether
+        the head pose was beyond the threshold on that frame
+        """
+        self._track_interval(now)
+
+        closed = ear < self.closed_threshold
+        if closed:
+            if self._closed_since is None:
+                self._closed_since = now
+            self._closed_run += 1
+        else:
+            if (self._closed_since is not None and self.blinks_observable
+                    and now - self._closed_since <= self.blink_max):
+                self.blinks += 1
+            self._closed_since = None
+            self._closed_run = 0
+        self._push(now, closed)
+
+        if self.ear_ema is None:
+            self.ear_ema = ear
+        else:
+            self.ear_ema += self.alpha * (ear - self.ear_ema)
+
+        sustained_closure = self._closed_run >= self.drowsy_samples
+        perclos = self.perclos(now)
+        candidate = self._classify(sustained_closure, perclos, looking_away)
+
+        changed = False
+        if candidate == self.status:
+            self._candidate = None
+            self._candidate_frames = 0
+        else:
+            if candidate == self._candidate:
+                self._candidate_frames += 1
+            else:
+                self._candidate = candidate
+                self._candidate_frames = 1
+            if self._candidate_frames >= self.hold or sustained_closure:
+                self.status = candidate
+                self._candidate = None
+                self._candidate_frames = 0
+                self.transitions += 1
+                changed = True
+
+        return {
+            "status": self.status,
+            "focus_score": STATUS_SCORES[self.status],
+            "changed": changed,
+            "ear_smoothed": round(self.ear_ema, 4),
+            "perclos": round(perclos, 3) if perclos is not None else None,
+            "blinks": self.blinks if self.blinks_observable else None
+        }
@@ -0,0 +1,68 @@
+"""
+Binary WebSocket frame protocol
+File: backend/app/services/frame_protocol.py
+
+Clients send each camera frame as one binary WebSocket message:
+
+    offset  size  field
+    0       1     version       (uint8, currently 1)
+    1       1     codec         (uint8, see CODEC_*)
+    2       4     frame_id      (uint32, big-endian)
+    6       8     timestamp_ms  (uint64, big-endian, client clock)
+    14      ...   encoded image bytes
+
+Compared to a JSON message carrying a base64 data URL this saves the ~33%
+base64 overhead and the json/split/b64decode copies: the payload is handed
+to cv2.imdecode as a memoryview over the received buffer.
+"""
+import base64
+import struct
+from typing import Dict, Tuple
+
+PROTOCOL_VERSION = 1
+
+CODEC_JPEG = 1
+CODEC_PNG = 2
+CODEC_WEBP = 3
+SUPPORTED_CODECS = {CODEC_JPEG, CODEC_PNG, CODEC_WEBP}
+
+HEADER = struct.Struct("!BBIQ")
+HEADER_SIZE = HEADER.size
+
+
+def encode_frame(image_bytes: bytes, frame_id: int, timestamp_ms: int,
+                 codec: int = CODEC_JPEG) -> bytes:
+    """Build a binary frame message (used by tools and benchmarks)"""
+    return HEADER.pack(PROTOCOL_VERSION, codec, frame_id, timestamp_ms) + image_bytes
+
+
+def decode_frame(data: bytes) -> Tuple[Dict, memoryview]:
+    """
+    Split a binary frame message into its header and image payload.
+
+    The payload is a memoryview into ``data``; no image bytes are copied.
+    Raises ValueError for malformed or unsupported messages.
+    """
+    if len(data) <= HEADER_SIZE:
+        raise ValueError("Binary frame too short")
+
+    version, codec, frame_id, timestamp_ms = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame protocol version: {version}")
+    if codec not in SUPPORTED_CODECS:
+        raise ValueError(f"Unsupported frame codec: {codec}")
+
+    header = {
+        "version": version,
+        "codec": codec,
+        "frame_id": frame_id,
+        "timestamp_ms": timestamp_ms
+    }
+    return header, memoryview(data)[HEADER_SIZE:]
+
+
+def decode_data_url(data_url: str) -> bytes:
+    """Decode the legacy JSON frame payload (a base64 data URL)"""
+    if "," in data_url:
+        data_url = data_url.split(",", 1)[1]
+    return base64.b64decode(data_url)
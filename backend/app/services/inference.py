@@ -0,0 +1,210 @@
+"""
+Inference executor for focus detection
+File: backend/app/services/inference.py
+
+Runs FocusDetector.detect_focus off the asyncio event loop so one frame's
+JPEG decode + FaceMesh pass never stalls the other connected sockets.
+
+In process mode every worker is its own single-process executor (a
+shard), and each key is pinned to one shard for as long as it is in use,
+so a session's frames always reach the worker holding its detector and
+tracking state.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Optional
+
+from app.services.focus_state import FocusStateMachine
+from app.utils.metrics import STAGE_SECONDS
+
+# Detector pool of this process. In thread mode it is shared by every
+# worker thread; in process mode each worker process holds its own.
+_detector_pool = None
+
+# Per-session smoothing state (EMA, blinks, PERCLOS, hysteresis), kept
+# outside the pool: an LRU-evicted detector is rebuilt on the next frame,
+# but the session's history must survive it. Dropped by _evict_in_worker.
+_session_states: Dict[object, FocusStateMachine] = {}
+
+
+def _init_worker(pool_size: int):
+    """Create the detector pool used by this worker"""
+    global _detector_pool
+    if _detector_pool is None:
+        from app.services.detector_pool import DetectorPool
+        _detector_pool = DetectorPool(max_size=pool_size)
+
+
+def _detect_in_worker(image_bytes: bytes, key: object) -> Dict:
+    """Run one detection on the detector leased to ``key``"""
+    state = _session_states.get(key)
+    if state is None:
+        state = _session_states.setdefault(key, FocusStateMachine())
+    detector, reused = _detector_pool.acquire(key)
+    try:
+        started = time.perf_counter()
+        result = detector.detect_focus(image_bytes, state=state)
+        result["inference_ms"] = (time.perf_counter() - started) * 1000.0
+    finally:
+        _detector_pool.release(key)
+    result["detector_reused"] = reused
+    return result
+
+
+def _evict_in_worker(key: object):
+    _session_states.pop(key, None)
+    if _detector_pool is not None:
+        _detector_pool.evict(key)
+
+
+class InferenceExecutor:
+    """Thread or process pool that the WebSocket path awaits for detections"""
+
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None,
+                 detector_pool_size: int = 32):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        if mode == "process":
+            self._shards = [
+                ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                    initargs=(detector_pool_size,))
+                for _ in range(self.max_workers)
+            ]
+        else:
+            self._shards = [ThreadPoolExecutor(max_workers=self.max_workers)]
+            _init_worker(detector_pool_size)
+
+        # Shard each key is pinned to, and how many keys each shard holds
+        self._key_shards: Dict[object, int] = {}
+        self._shard_keys = [0] * len(self._shards)
+
+        # One lock per connection keeps that connection's frames in order
+        self._ordering_locks: Dict[object, asyncio.Lock] = {}
+        # Latest frame submitted per key (still running after its caller
+        # is cancelled)
+        self._in_flight: Dict[object, Future] = {}
+
+        # Metrics
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_ms = 0.0
+        self.total_latency_ms = 0.0
+        self.last_latency_ms = 0.0
+        self.pool_hits = 0
+        self.pool_misses = 0
+
+    async def detect(self, image_bytes: bytes, key: object) -> Dict:
+        """
+        Detect focus for one frame without blocking the event loop.
+
+        Frames submitted with the same ``key`` (e.g. a session id) are
+        processed strictly in submission order and share one leased
+        detector, so FaceMesh can track the face across them.
+        """
+        lock = self._ordering_locks.get(key)
+        if lock is None:
+            lock = self._ordering_locks[key] = asyncio.Lock()
+        async with lock:
+            return await self._submit(image_bytes, key)
+
+    async def _submit(self, image_bytes: bytes, key: object) -> Dict:
+        if self.mode == "process" and isinstance(image_bytes, memoryview):
+            # Zero-copy views cannot be pickled to another process
+            image_bytes = image_bytes.tobytes()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        submitted = time.perf_counter()
+        try:
+            future = self._shard_for(key).submit(_detect_in_worker, image_bytes, key)
+            self._in_flight[key] = future
+            result = await asyncio.wrap_future(future)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.queue_depth -= 1
+
+        latency_ms = (time.perf_counter() - submitted) * 1000.0
+        self.completed += 1
+        self.last_latency_ms = latency_ms
+        self.total_latency_ms += latency_ms
+        self.total_wait_ms += max(latency_ms - result.get("inference_ms", 0.0), 0.0)
+        STAGE_SECONDS.observe(result.get("inference_ms", 0.0) / 1000.0, stage="detect")
+        if result.get("detector_reused"):
+            self.pool_hits += 1
+        else:
+            self.pool_misses += 1
+        return result
+
+    def _shard_for(self, key: object):
+        """The executor ``key`` is pinned to (the least used one, on first use)"""
+        index = self._key_shards.get(key)
+        if index is None:
+            index = min(range(len(self._shards)), key=self._shard_keys.__getitem__)
+            self._key_shards[key] = index
+            self._shard_keys[index] += 1
+        return self._shards[index]
+
+    @property
+    def load(self) -> float:
+        """Frames waiting or running per worker"""
+        return self.queue_depth / self.max_workers
+
+    def release(self, key: object):
+        """Forget the ordering state and detector of a closed connection"""
+        self._ordering_locks.pop(key, None)
+        pending = self._in_flight.pop(key, None)
+        index = self._key_shards.pop(key, None)
+        if index is None:
+            return
+        self._shard_keys[index] -= 1
+        shard = self._shards[index]
+        if pending is None or pending.done():
+            self._submit_evict(shard, key)
+        else:
+            # The last frame keeps running even though its caller was
+            # cancelled, and the pool won't evict a leased detector; evict
+            # once that frame has released it
+            pending.add_done_callback(lambda _: self._submit_evict(shard, key))
+
+    @staticmethod
+    def _submit_evict(shard, key: object):
+        try:
+            shard.submit(_evict_in_worker, key)
+        except RuntimeError:
+            # Executor already shut down
+            pass
+
+    def get_stats(self) -> Dict:
+        """Queue depth and latency metrics"""
+        completed = self.completed or 1
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait_ms / completed, 2),
+            "avg_latency_ms": round(self.total_latency_ms / completed, 2),
+            "last_latency_ms": round(self.last_latency_ms, 2),
+            "detector_pool": self._detector_pool_stats(),
+        }
+
+    def _detector_pool_stats(self) -> Dict:
+        # Process workers' pools live in other processes, so hits and misses
+        # are counted here from the flag each result carries
+        stats = _detector_pool.get_stats() if self.mode == "thread" else {}
+        stats.update({"hits": self.pool_hits, "misses": self.pool_misses})
+        return stats
+
+    def shutdown(self):
+        for shard in self._shards:
+            shard.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,201 @@
+"""
+Live per-connection session state
+File: backend/app/services/live_session.py
+
+Each WebSocket connection keeps its running counters in a LiveSession
+(status counts, score sum/min/max, last status) instead of mutating the
+FocusSession row per frame. Scores are summed unrounded, like user_stats
+and the minute/hour rollups, so all three report the same average; it is
+derived from the sum on demand rather than updated incrementally.
+
+LiveSessionTracker checkpoints every changed session to focus_sessions
+in one batched UPDATE every few seconds, and once more when the
+connection closes. A checkpoint writes absolute totals, so it is
+idempotent, and a crash loses at most one checkpoint interval of counters.
+A session whose final write fails stays registered, marked closed, and
+is written (with its end time) by the next checkpoint instead.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.database import run_in_session
+from app.models import FocusSession
+
+COUNTED_STATUSES = ("focused", "distracted", "drowsy")
+
+
+class LiveSession:
+    """Running counters of one connection's focus session"""
+
+    __slots__ = ("session_id", "user_id", "focused", "distracted", "drowsy",
+                 "score_sum", "score_min", "score_max", "last_status",
+                 "end_time", "version", "checkpointed_version")
+
+    def __init__(self, session_id: int, user_id: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.focused = 0
+        self.distracted = 0
+        self.drowsy = 0
+        self.score_sum = 0.0
+        self.score_min: Optional[float] = None
+        self.score_max: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.end_time: Optional[datetime] = None  # set once the connection closed
+        # Bumped on every change; compared with the last checkpoint
+        self.version = 0
+        self.checkpointed_version = 0
+
+    def record(self, status: str, focus_score: float):
+        self.last_status = status
+        self.version += 1
+        if status not in COUNTED_STATUSES:
+            return
+        score = float(focus_score)
+        if status == "focused":
+            self.focused += 1
+        elif status == "distracted":
+            self.distracted += 1
+        else:
+            self.drowsy += 1
+        self.score_sum += score
+        self.score_min = score if self.score_min is None else min(self.score_min, score)
+        self.score_max = score if self.score_max is None else max(self.score_max, score)
+
+    @property
+    def count(self) -> int:
+        return self.focused + self.distracted + self.drowsy
+
+    @property
+    def avg_score(self) -> float:
+        count = self.count
+        return self.score_sum / count if count else 0.0
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.checkpointed_version
+
+    def stats(self) -> Dict:
+        """Running totals in the shape the client expects"""
+        return {
+            "totalFocused": self.focused,
+            "totalDistracted": self.distracted,
+            "totalDrowsy": self.drowsy,
+            "avgScore": int(self.avg_score),
+            "minScore": None if self.score_min is None else int(round(self.score_min)),
+            "maxScore": None if self.score_max is None else int(round(self.score_max))
+        }
+
+    def checkpoint_row(self) -> Dict:
+        """Absolute focus_sessions values (keyed for a bulk UPDATE by id)"""
+        row = {
+            "id": self.session_id,
+            "total_focused": self.focused,
+            "total_distracted": self.distracted,
+            "total_drowsy": self.drowsy,
+            "avg_score": self.avg_score
+        }
+        if self.end_time is not None:
+            row["end_time"] = self.end_time
+        return row
+
+
+def write_checkpoint(db: Session, rows: List[Dict]):
+    """One executemany UPDATE of focus_sessions by primary key. Commits."""
+    db.execute(update(FocusSession), rows)
+    db.commit()
+
+
+class LiveSessionTracker:
+    """Registry of open LiveSessions with periodic, batched checkpoints"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.sessions: Dict[int, LiveSession] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+        # Metrics
+        self.checkpoints = 0
+        self.rows_checkpointed = 0
+        self.failures = 0
+        self.last_checkpoint_ms = 0.0
+
+    async def start(self):
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the timer and write a final checkpoint"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        await self.checkpoint()
+
+    def open(self, session_id: int, user_id: int) -> LiveSession:
+        live = self.sessions[session_id] = LiveSession(session_id, user_id)
+        return live
+
+    async def close(self, session_id: int, end_time: Optional[datetime] = None) -> bool:
+        """
+        Write the session's final totals (and end time) and forget it.
+        If the write fails the session is kept for the next checkpoint.
+        """
+        live = self.sessions.get(session_id)
+        if live is None or live.end_time is not None:
+            return False
+        live.end_time = end_time or datetime.utcnow()
+        live.version += 1
+        async with self._lock:
+            version = live.version
+            try:
+                await run_in_session(write_checkpoint, [live.checkpoint_row()])
+            except Exception as e:
+                self.failures += 1
+                print(f"❌ Final write of session {session_id} failed, retrying at next checkpoint: {e}")
+                return False
+            live.checkpointed_version = version
+            self.sessions.pop(session_id, None)
+        return True
+
+    async def checkpoint(self):
+        """Write every session that changed since its last checkpoint"""
+        async with self._lock:
+            pending = [(live, live.version) for live in self.sessions.values() if live.dirty]
+            if not pending:
+                return
+            started = time.perf_counter()
+            try:
+                await run_in_session(write_checkpoint, [live.checkpoint_row() for live, _ in pending])
+            except Exception as e:
+                self.failures += 1
+                print(f"❌ Session checkpoint failed ({len(pending)} sessions): {e}")
+                return
+            for live, version in pending:
+                live.checkpointed_version = version
+                if live.end_time is not None:
+                    # Closed earlier, when its final write failed
+                    self.sessions.pop(live.session_id, None)
+            self.checkpoints += 1
+            self.rows_checkpointed += len(pending)
+            self.last_checkpoint_ms = (time.perf_counter() - started) * 1000.0
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.checkpoint()
+
+    def get_stats(self) -> Dict:
+        return {
+            "open_sessions": len(self.sessions),
+            "checkpoints": self.checkpoints,
+            "rows_checkpointed": self.rows_checkpointed,
+            "failures": self.failures,
+            "last_checkpoint_ms": round(self.last_checkpoint_ms, 2)
+        }
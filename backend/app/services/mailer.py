@@ -0,0 +1,336 @@
+"""
+Outbound mail queue
+File: backend/app/services/mailer.py
+
+Emails are queued instead of sent inline. A fixed number of worker tasks
+(SMTP_MAX_CONNECTIONS, the concurrency limit) each keep one SMTP
+connection open and reuse it: the TLS handshake and login happen once per
+connection rather than once per email, and a worker sends every message
+waiting in the queue (up to SMTP_BATCH_SIZE) before going back to wait.
+Idle connections are closed after SMTP_IDLE_TIMEOUT seconds and reopened
+on demand.
+
+Temporary failures (4xx replies, dropped connections) are retried with
+exponential backoff; permanent ones (5xx, refused recipients) fail the
+message at once. smtplib is blocking, so the SMTP conversation runs in a
+worker thread.
+
+For local testing, run ``python smtp_debug_server.py`` and point
+SMTP_SERVER/SMTP_PORT at it with SMTP_STARTTLS=false.
+"""
+import asyncio
+import smtplib
+import time
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.logger import log_sampled
+
+
+def build_message(to_email: str, subject: str, html_content: str,
+                  from_email: Optional[str] = None) -> EmailMessage:
+    """HTML email (with a plain-text fallback part)"""
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = from_email or settings.FROM_EMAIL
+    message["To"] = to_email
+    message.set_content("This email is best viewed in an HTML-capable mail client.")
+    message.add_alternative(html_content, subtype="html")
+    return message
+
+
+def is_temporary(error: Exception) -> bool:
+    """Whether sending again later may succeed"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # Dropped connections, timeouts, DNS and socket errors (SMTPException
+    # is itself an OSError, so exclude the protocol errors)
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _Outgoing:
+    __slots__ = ("message", "attempts", "done")
+
+    def __init__(self, message: EmailMessage, done: Optional[asyncio.Future]):
+        self.message = message
+        self.attempts = 0
+        self.done = done
+
+
+class SMTPConnection:
+    """One reusable SMTP connection (used from a single worker at a time)"""
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = True,
+                 timeout: float = 30.0, max_messages: int = 100):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_messages = max_messages
+
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._sent = 0
+        self.opened = 0
+
+    def _open(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.starttls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self._sent = 0
+        self.opened += 1
+
+    def send(self, message: EmailMessage):
+        """Send over the open connection, (re)connecting when needed"""
+        if self._smtp is not None and self._sent >= self.max_messages:
+            # Servers cap messages per connection; start a fresh one
+            self.close()
+        if self._smtp is None:
+            self._open()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped a connection we were holding; retry once
+            self._drop()
+            self._open()
+            try:
+                self._smtp.send_message(message)
+            except Exception:
+                # Don't keep a half-open connection for the next message
+                self._drop()
+                raise
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # Reset the transaction so the connection stays usable
+            self._reset()
+            raise
+        except OSError:
+            self._drop()
+            raise
+        self._sent += 1
+
+    def _reset(self):
+        try:
+            self._smtp.rset()
+        except (smtplib.SMTPException, OSError):
+            self._drop()
+
+    def _drop(self):
+        if self._smtp is not None:
+            self._smtp.close()
+            self._smtp = None
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._drop()
+
+    @property
+    def is_open(self) -> bool:
+        return self._smtp is not None
+
+
+class MailQueue:
+    """Bounded outbound queue served by a few pooled SMTP connections"""
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = True,
+                 max_connections: int = 4, batch_size: int = 50,
+                 max_messages_per_connection: int = 100, max_retries: int = 3,
+                 retry_backoff: float = 2.0, idle_timeout: float = 30.0,
+                 max_queue: int = 10000, timeout: float = 30.0):
+        self.connection_options = {
+            "host": host, "port": port, "username": username, "password": password,
+            "starttls": starttls, "timeout": timeout,
+            "max_messages": max_messages_per_connection
+        }
+        self.max_connections = max(1, max_connections)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.max_queue = max_queue
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._connections: List[SMTPConnection] = []
+        self._retries: set = set()
+
+        # Metrics
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.last_send_ms = 0.0
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._connections = [SMTPConnection(**self.connection_options)
+                             for _ in range(self.max_connections)]
+        self._workers = [asyncio.create_task(self._worker(connection))
+                         for connection in self._connections]
+
+    async def stop(self, drain: bool = True):
+        """Stop the workers (after sending what is queued, by default)"""
+        if not self._workers:
+            return
+        if drain:
+            await self.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for task in self._retries:
+            task.cancel()
+        await asyncio.gather(*[asyncio.to_thread(connection.close)
+                               for connection in self._connections])
+        self._workers = []
+        self._connections = []
+
+    async def enqueue(self, message: EmailMessage) -> asyncio.Future:
+        """
+        Queue a message; waits while the queue is full. The returned future
+        resolves to True once sent, or False once it has finally failed.
+        """
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Outgoing(message, done))
+        return done
+
+    async def send(self, message: EmailMessage) -> bool:
+        """Queue a message and wait for its delivery result"""
+        return await (await self.enqueue(message))
+
+    async def join(self):
+        """Wait until every queued message (including retries) is settled"""
+        while True:
+            await self._queue.join()
+            if not self._retries:
+                return
+            await asyncio.gather(*list(self._retries), return_exceptions=True)
+
+    async def _worker(self, connection: SMTPConnection):
+        while True:
+            batch = await self._take(connection)
+            try:
+                results = await asyncio.to_thread(self._deliver, connection, batch)
+                for item, error in results:
+                    self._settle(item, error)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _take(self, connection: SMTPConnection) -> List[_Outgoing]:
+        """Wait for the next message, then take whatever else is queued"""
+        try:
+            item = await asyncio.wait_for(self._queue.get(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            # Nothing to send for a while; give the connection back
+            if connection.is_open:
+                await asyncio.to_thread(connection.close)
+            item = await self._queue.get()
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    def _deliver(self, connection: SMTPConnection,
+                 batch: List[_Outgoing]) -> List[Tuple[_Outgoing, Optional[Exception]]]:
+        """Send a batch over one connection (worker thread)"""
+        started = time.perf_counter()
+        results = []
+        down: Optional[Exception] = None
+        for item in batch:
+            item.attempts += 1
+            if down is not None:
+                # The server is unreachable; don't dial it once per message
+                results.append((item, down))
+                continue
+            try:
+                connection.send(item.message)
+                results.append((item, None))
+            except Exception as e:
+                results.append((item, e))
+                if not connection.is_open and is_temporary(e):
+                    down = e
+        self.last_send_ms = (time.perf_counter() - started) * 1000.0 / len(batch)
+        return results
+
+    def _settle(self, item: _Outgoing, error: Optional[Exception]):
+        if error is None:
+            self.sent += 1
+            self._resolve(item, True)
+            return
+        recipient = item.message["To"]
+        if is_temporary(error) and item.attempts <= self.max_retries:
+            delay = self.retry_backoff * (2 ** (item.attempts - 1))
+            self.retried += 1
+            log_sampled("mail-retry", f"⚠️ Email to {recipient} failed ({error}); retrying in {delay:.1f}s")
+            task = asyncio.create_task(self._retry_later(item, delay))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return
+        self.failed += 1
+        log_sampled("mail-failed", f"❌ Error sending email to {recipient}: {error} ({self.failed} failed so far)")
+        self._resolve(item, False)
+
+    async def _retry_later(self, item: _Outgoing, delay: float):
+        await asyncio.sleep(delay)
+        await self._queue.put(item)
+
+    @staticmethod
+    def _resolve(item: _Outgoing, sent: bool):
+        if item.done is not None and not item.done.done():
+            item.done.set_result(sent)
+
+    def get_stats(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "connections": self.max_connections,
+            "open_connections": sum(1 for c in self._connections if c.is_open),
+            "connections_opened": sum(c.opened for c in self._connections),
+            "pending_retries": len(self._retries),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "last_send_ms": round(self.last_send_ms, 2),
+        }
+
+
+mail_queue = MailQueue(
+    settings.SMTP_SERVER,
+    settings.SMTP_PORT,
+    username=settings.SMTP_USERNAME,
+    password=settings.SMTP_PASSWORD,
+    starttls=settings.SMTP_STARTTLS,
+    max_connections=settings.SMTP_MAX_CONNECTIONS,
+    batch_size=settings.SMTP_BATCH_SIZE,
+    max_messages_per_connection=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+    max_retries=settings.SMTP_MAX_RETRIES,
+    retry_backoff=settings.SMTP_RETRY_BACKOFF,
+    idle_timeout=settings.SMTP_IDLE_TIMEOUT,
+    max_queue=settings.SMTP_QUEUE_SIZE,
+    timeout=settings.SMTP_TIMEOUT
+)
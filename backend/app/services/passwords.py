@@ -0,0 +1,81 @@
+"""
+Password hashing
+File: backend/app/services/passwords.py
+
+Passwords are hashed with a salted, tunable KDF (scrypt by default; see the
+PASSWORD_* settings) through passlib. Legacy unsalted SHA-256 hex digests
+still verify, and verify() returns a replacement hash for them, as it does
+for hashes made with another scheme or weaker parameters than configured.
+
+A deliberately slow hash must not run on the event loop, nor in the shared
+threadpool that serves every sync endpoint, or a burst of logins would
+starve other requests. The async helpers run it in a small dedicated
+thread pool instead; the KDFs release the GIL while they work.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.config import settings
+
+SUPPORTED_SCHEMES = ("scrypt", "pbkdf2_sha256", "bcrypt")
+
+
+def _build_context() -> CryptContext:
+    default = settings.PASSWORD_HASH_SCHEME
+    if default not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported password hash scheme: {default}")
+    schemes = [default] + [s for s in SUPPORTED_SCHEMES if s != default] + ["hex_sha256"]
+    return CryptContext(
+        schemes=schemes,
+        default=default,
+        # Everything but the configured scheme gets rehashed on login
+        deprecated="auto",
+        scrypt__rounds=settings.PASSWORD_SCRYPT_LOG_N,
+        scrypt__block_size=settings.PASSWORD_SCRYPT_BLOCK_SIZE,
+        scrypt__parallelism=1,
+        pbkdf2_sha256__rounds=settings.PASSWORD_PBKDF2_ROUNDS,
+        bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    )
+
+
+pwd_context = _build_context()
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+    thread_name_prefix="password-hash"
+)
+
+
+async def hash_password(password: str) -> str:
+    """Hash a new password off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, pwd_context.hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password off the event loop.
+
+    Returns (valid, new_hash); new_hash is set when the stored hash is
+    valid but outdated (legacy SHA-256, other scheme, weaker parameters)
+    and should be replaced.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_executor, pwd_context.verify_and_update, password, hashed)
+    except ValueError:
+        # Unrecognised hash format
+        return False, None
+
+
+async def dummy_verify():
+    """Spend a verify's worth of time, so unknown usernames are not faster to reject"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_executor, pwd_context.dummy_verify)
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,367 @@
+"""
+Bulk daily / weekly report job
+File: backend/app/services/report_job.py
+
+Every user's report metrics for a period come from one set-based query
+(CTEs over focus_sessions and the hourly detection rollups, joined to
+users), never one query per user:
+
+- sessions, focus time, detection-weighted average and best session score
+  (plus the previous period's average, for the weekly "improvement" line)
+- peak hour: the hour of day (UTC) with the most focused detections
+- streak: consecutive days with a session, ending on the period's last day
+  (gaps-and-islands over session days, looking back
+  REPORT_STREAK_LOOKBACK_DAYS)
+- weekly reports: focused share of each of the seven days
+
+Rows are streamed from a server-side cursor in REPORT_CHUNK_SIZE chunks on
+a worker thread; each chunk is rendered (app/services/reports.py) and
+queued for delivery (app/services/mailer.py) while the next one is read.
+Run it with ``python send_reports.py daily|weekly``.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, and_, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User, FocusSession, DetectionHour
+from app.services.mailer import build_message, mail_queue
+from app.services.reports import (
+    daily_report_context, weekly_report_context, render_reports_async
+)
+
+REPORT_KINDS = ("daily", "weekly")
+EPOCH = datetime(1970, 1, 1)
+
+
+def report_period(kind: str, day: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """[start, end) of the report ending on ``day`` (default: yesterday, UTC)"""
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"Unknown report kind: {kind}")
+    day = day or (datetime.utcnow().date() - timedelta(days=1))
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+    return end - timedelta(days=1 if kind == "daily" else 7), end
+
+
+def _day_number(timestamp: datetime) -> int:
+    return (timestamp - EPOCH).days
+
+
+# ==================== Dialect Helpers ====================
+
+def _epoch_seconds(column, dialect: str):
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    return func.extract("epoch", column)
+
+
+def _sql_day_number(column, dialect: str):
+    """Days since 1970-01-01 of a naive UTC timestamp column"""
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer) // 86400
+    return cast(func.floor(func.extract("epoch", column) / 86400), Integer)
+
+
+# ==================== Aggregation ====================
+
+def report_rows_query(dialect: str, kind: str, start: datetime, end: datetime,
+                      user_ids: Optional[Sequence[int]] = None):
+    """One row of report metrics per user with a session in [start, end)"""
+    length = end - start
+    previous_start = start - length
+    in_period = FocusSession.start_time >= start
+    detections = (func.coalesce(FocusSession.total_focused, 0) +
+                  func.coalesce(FocusSession.total_distracted, 0) +
+                  func.coalesce(FocusSession.total_drowsy, 0))
+    score_total = func.coalesce(FocusSession.avg_score, 0.0) * detections
+    duration = func.coalesce(
+        _epoch_seconds(FocusSession.end_time, dialect) -
+        _epoch_seconds(FocusSession.start_time, dialect), 0
+    )
+
+    session_filter = [FocusSession.start_time >= previous_start, FocusSession.start_time < end]
+    if user_ids is not None:
+        session_filter.append(FocusSession.user_id.in_(list(user_ids)))
+    sessions = (
+        select(
+            FocusSession.user_id.label("user_id"),
+            func.sum(case((in_period, 1), else_=0)).label("total_sessions"),
+            func.sum(case((in_period, duration), else_=0)).label("duration_seconds"),
+            func.sum(case((in_period, detections), else_=0)).label("detections"),
+            func.sum(case((in_period, score_total), else_=0.0)).label("score_total"),
+            func.max(case((and_(in_period, detections > 0), FocusSession.avg_score))).label("best_score"),
+            func.sum(case((in_period, 0), else_=detections)).label("previous_detections"),
+            func.sum(case((in_period, 0.0), else_=score_total)).label("previous_score_total"),
+        )
+        .where(*session_filter)
+        .group_by(FocusSession.user_id)
+        .cte("sessions")
+    )
+
+    # Hour of day with the most focused detections
+    hour = func.extract("hour", DetectionHour.bucket_start)
+    focused_by_hour = (
+        select(
+            DetectionHour.user_id.label("user_id"),
+            hour.label("hour"),
+            func.sum(DetectionHour.focused).label("focused"),
+        )
+        .where(DetectionHour.bucket_start >= start, DetectionHour.bucket_start < end)
+        .group_by(DetectionHour.user_id, hour)
+        .subquery()
+    )
+    ranked_hours = select(
+        focused_by_hour.c.user_id,
+        focused_by_hour.c.hour,
+        func.row_number().over(
+            partition_by=focused_by_hour.c.user_id,
+            order_by=(focused_by_hour.c.focused.desc(), focused_by_hour.c.hour)
+        ).label("rank"),
+    ).subquery()
+    peak = (
+        select(ranked_hours.c.user_id, ranked_hours.c.hour)
+        .where(ranked_hours.c.rank == 1)
+        .cte("peak")
+    )
+
+    # Streak: islands of consecutive session days; keep the one ending on
+    # the period's last day
+    session_day = _sql_day_number(FocusSession.start_time, dialect)
+    day_filter = [
+        FocusSession.start_time >= end - timedelta(days=settings.REPORT_STREAK_LOOKBACK_DAYS),
+        FocusSession.start_time < end
+    ]
+    if user_ids is not None:
+        day_filter.append(FocusSession.user_id.in_(list(user_ids)))
+    session_days = (
+        select(FocusSession.user_id.label("user_id"), session_day.label("day"))
+        .where(*day_filter)
+        .distinct()
+        .subquery()
+    )
+    islands = select(
+        session_days.c.user_id,
+        session_days.c.day,
+        (session_days.c.day - func.row_number().over(
+            partition_by=session_days.c.user_id, order_by=session_days.c.day
+        )).label("island"),
+    ).subquery()
+    streak_runs = (
+        select(
+            islands.c.user_id,
+            func.count().label("streak"),
+            func.max(islands.c.day).label("last_day"),
+        )
+        .group_by(islands.c.user_id, islands.c.island)
+        .subquery()
+    )
+    streak = (
+        select(streak_runs.c.user_id, streak_runs.c.streak)
+        .where(streak_runs.c.last_day == _day_number(end) - 1)
+        .cte("streak")
+    )
+
+    columns = [
+        User.id.label("user_id"), User.email, User.username, User.full_name,
+        sessions.c.total_sessions, sessions.c.duration_seconds, sessions.c.detections,
+        sessions.c.score_total, sessions.c.best_score,
+        sessions.c.previous_detections, sessions.c.previous_score_total,
+        peak.c.hour.label("peak_hour"),
+        func.coalesce(streak.c.streak, 0).label("streak"),
+    ]
+    query = (
+        select(*columns)
+        .join_from(sessions, User, User.id == sessions.c.user_id)
+        .outerjoin(peak, peak.c.user_id == sessions.c.user_id)
+        .outerjoin(streak, streak.c.user_id == sessions.c.user_id)
+        .where(sessions.c.total_sessions > 0)
+        .order_by(sessions.c.user_id)
+    )
+
+    if kind == "weekly":
+        # Focused / counted detections of each day, as 14 columns
+        first_day = _day_number(start)
+        bucket_day = _sql_day_number(DetectionHour.bucket_start, dialect)
+        counted = DetectionHour.focused + DetectionHour.distracted + DetectionHour.drowsy
+        day_columns = []
+        for offset in range(7):
+            on_day = bucket_day == first_day + offset
+            day_columns.append(func.sum(case((on_day, DetectionHour.focused), else_=0)).label(f"focused_{offset}"))
+            day_columns.append(func.sum(case((on_day, counted), else_=0)).label(f"counted_{offset}"))
+        days = (
+            select(DetectionHour.user_id.label("user_id"), *day_columns)
+            .where(DetectionHour.bucket_start >= start, DetectionHour.bucket_start < end)
+            .group_by(DetectionHour.user_id)
+            .cte("days")
+        )
+        query = query.add_columns(*[days.c[column.name] for column in day_columns])
+        query = query.outerjoin(days, days.c.user_id == sessions.c.user_id)
+
+    return query
+
+
+# ==================== Template Stats ====================
+
+def _format_hour(hour: Optional[int]) -> str:
+    if hour is None:
+        return "n/a"
+    hour = int(hour)
+    return f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'} UTC"
+
+
+def report_stats(kind: str, row: Dict, start: datetime) -> Dict:
+    """Template stats of one aggregated row"""
+    detections = row["detections"] or 0
+    avg_score = row["score_total"] / detections if detections else 0.0
+    seconds = int(row["duration_seconds"] or 0)
+    stats = {
+        "total_sessions": row["total_sessions"],
+        "avg_score": avg_score,
+        "best_score": row["best_score"] or 0,
+        "peak_hour": _format_hour(row["peak_hour"]),
+        "streak": row["streak"],
+        "total_duration": f"{seconds // 3600}h {(seconds % 3600) // 60}m",
+    }
+    if kind == "weekly":
+        week_data = []
+        for offset in range(7):
+            counted = row[f"counted_{offset}"] or 0
+            day = start + timedelta(days=offset)
+            week_data.append({
+                "name": day.strftime("%a"),
+                "percentage": round(100 * (row[f"focused_{offset}"] or 0) / counted) if counted else 0,
+                "active": counted > 0,
+            })
+        previous = row["previous_detections"] or 0
+        previous_avg = row["previous_score_total"] / previous if previous else None
+        best_day = max(week_data, key=lambda d: d["percentage"])
+        stats.update({
+            "week_range": f"{start:%b %d} - {start + timedelta(days=6):%b %d}",
+            "week_data": week_data,
+            "total_hours": round(seconds / 3600, 1),
+            "improvement": round(avg_score - previous_avg, 1) if previous_avg is not None else 0,
+            "best_day": best_day["name"] if best_day["active"] else "n/a",
+            "consistency": round(100 * sum(d["active"] for d in week_data) / 7),
+        })
+    return stats
+
+
+def iter_report_chunks(db: Session, kind: str, start: datetime, end: datetime,
+                       chunk_size: int = 500,
+                       user_ids: Optional[Sequence[int]] = None) -> Iterator[List[Dict]]:
+    """Aggregated rows, read from a server-side cursor ``chunk_size`` at a time"""
+    dialect = db.get_bind().dialect.name
+    query = report_rows_query(dialect, kind, start, end, user_ids)
+    result = db.execute(query.execution_options(yield_per=chunk_size))
+    for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
+
+
+# ==================== Job ====================
+
+def _subject(kind: str, start: datetime, stats: Dict) -> str:
+    if kind == "daily":
+        return f"📊 Your Daily Focus Report - {start:%B %d, %Y}"
+    return f"📅 Your Weekly Focus Report - Week of {stats['week_range']}"
+
+
+# How often a reader blocked on a full queue checks whether to give up
+READER_PUT_TIMEOUT = 1.0
+
+
+def _put(loop, queue: asyncio.Queue, item, stop: threading.Event) -> bool:
+    """Put ``item`` on the loop's queue from a thread; False once ``stop`` is set"""
+    future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+    while True:
+        try:
+            future.result(timeout=READER_PUT_TIMEOUT)
+            return True
+        except concurrent.futures.TimeoutError:
+            if stop.is_set() and future.cancel():
+                return False
+
+
+def _read_chunks(loop, queue: asyncio.Queue, stop: threading.Event,
+                 kind, start, end, chunk_size, user_ids):
+    """
+    Worker thread: push chunks to ``queue`` (blocking while it is full)
+    until the chunks run out or the consumer sets ``stop``
+    """
+    db = SessionLocal()
+    try:
+        for chunk in iter_report_chunks(db, kind, start, end, chunk_size, user_ids):
+            if stop.is_set() or not _put(loop, queue, chunk, stop):
+                return
+    finally:
+        db.close()
+        if not stop.is_set():
+            _put(loop, queue, None, stop)
+
+
+async def run_report_job(kind: str, day: Optional[date] = None,
+                         user_ids: Optional[Sequence[int]] = None,
+                         chunk_size: Optional[int] = None, send: bool = True) -> Dict:
+    """
+    Build, render and (unless ``send`` is False) email the ``kind`` report
+    of every user active in the period. Returns the job's counters.
+    """
+    start, end = report_period(kind, day)
+    chunk_size = chunk_size or settings.REPORT_CHUNK_SIZE
+    started = time.perf_counter()
+    if send:
+        await mail_queue.start()
+
+    # Two chunks in flight: one being rendered / queued, the next being read
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=2)
+    stop = threading.Event()
+    reader = asyncio.create_task(asyncio.to_thread(
+        _read_chunks, asyncio.get_running_loop(), chunks, stop, kind, start, end, chunk_size, user_ids
+    ))
+
+    users = 0
+    deliveries: List[asyncio.Future] = []
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                break
+            users += len(chunk)
+            stats = [report_stats(kind, row, start) for row in chunk]
+            contexts = [
+                daily_report_context({"name": row["full_name"] or row["username"]}, stat, start)
+                if kind == "daily" else
+                weekly_report_context({"name": row["full_name"] or row["username"]}, stat)
+                for row, stat in zip(chunk, stats)
+            ]
+            rendered = await render_reports_async([(kind, context) for context in contexts])
+            if send:
+                for row, stat, html in zip(chunk, stats, rendered):
+                    message = build_message(row["email"], _subject(kind, start, stat), html)
+                    deliveries.append(await mail_queue.enqueue(message))
+        await reader
+    finally:
+        # On failure, tell the reader to stop and wait for it to close
+        # its connection (a thread cannot be cancelled outright)
+        stop.set()
+        await asyncio.gather(reader, return_exceptions=True)
+
+    results = await asyncio.gather(*deliveries)
+    summary = {
+        "kind": kind,
+        "period_start": start.isoformat(),
+        "period_end": end.isoformat(),
+        "users": users,
+        "sent": sum(1 for sent in results if sent),
+        "failed": sum(1 for sent in results if not sent),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    print(f"📬 {kind.capitalize()} reports: {summary['users']} users, "
+          f"{summary['sent']} sent, {summary['failed']} failed in {summary['seconds']}s")
+    return summary
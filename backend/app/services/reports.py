@@ -0,0 +1,181 @@
+"""
+Report rendering
+File: backend/app/services/reports.py
+
+The daily and weekly report templates (app/templates/*.html) are loaded
+through one Jinja Environment per process and compiled once: the
+Environment caches compiled templates and never re-checks the source
+(auto_reload off), and with REPORT_TEMPLATE_CACHE_DIR set, the compiled
+bytecode is also cached on disk for the next process. warm_templates()
+compiles everything up front, so the first email does not pay for it.
+
+Rendering is pure Python and holds the GIL, so render_reports() spreads a
+large batch over a process pool (each worker compiles the templates once
+when it starts); small batches are rendered inline. stream_report() yields
+the HTML in chunks instead of building one string.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from app.config import settings
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+REPORT_TEMPLATES = {
+    "daily": "daily_report.html",
+    "weekly": "weekly_report.html",
+}
+
+
+def _build_environment() -> Environment:
+    bytecode_cache = None
+    if settings.REPORT_TEMPLATE_CACHE_DIR:
+        os.makedirs(settings.REPORT_TEMPLATE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(settings.REPORT_TEMPLATE_CACHE_DIR)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+        cache_size=-1,
+        bytecode_cache=bytecode_cache,
+    )
+
+
+environment = _build_environment()
+
+
+def warm_templates():
+    """Compile every report template now rather than on first use"""
+    for filename in REPORT_TEMPLATES.values():
+        environment.get_template(filename)
+
+
+# ==================== Template Context ====================
+
+def daily_report_context(user_data: Dict, stats: Dict, date: Optional[datetime] = None) -> Dict:
+    """Template variables of a daily report"""
+    # Calculate insights
+    insights = []
+    if stats['avg_score'] > 75:
+        insights.append("Excellent focus today! You're in the zone! 🎯")
+    elif stats['avg_score'] > 50:
+        insights.append("Good effort today! Keep building that focus muscle! 💪")
+    else:
+        insights.append("Tomorrow is a new day! Start fresh and focused! 🌅")
+
+    if stats['total_sessions'] > 5:
+        insights.append("You had multiple focused sessions - great consistency! ⭐")
+
+    insights.append(f"Your best hour was {stats['peak_hour']} - try to schedule important tasks then! 🕐")
+
+    return {
+        "user_name": user_data['name'],
+        "date": (date or datetime.now()).strftime("%B %d, %Y"),
+        "total_sessions": stats['total_sessions'],
+        "total_duration": stats['total_duration'],
+        "avg_score": int(stats['avg_score']),
+        "best_score": int(stats['best_score']),
+        "peak_hour": stats['peak_hour'],
+        "insight_1": insights[0] if len(insights) > 0 else "",
+        "insight_2": insights[1] if len(insights) > 1 else "",
+        "insight_3": insights[2] if len(insights) > 2 else "",
+    }
+
+
+def weekly_report_context(user_data: Dict, stats: Dict) -> Dict:
+    """Template variables of a weekly report"""
+    # Calculate trends
+    trends = [
+        f"Your average score improved by {stats.get('improvement', 0)}% this week!",
+        f"Most productive day was {stats.get('best_day', 'Monday')}",
+        f"You maintained a {stats.get('consistency', 0)}% consistency rate"
+    ]
+
+    return {
+        "user_name": user_data['name'],
+        "week_range": stats['week_range'],
+        "week_data": stats['week_data'],
+        "total_sessions": stats['total_sessions'],
+        "total_hours": stats['total_hours'],
+        "avg_score": int(stats['avg_score']),
+        "streak": stats['streak'],
+        "achievements": stats.get('achievements', []),
+        "trend_1": trends[0],
+        "trend_2": trends[1],
+        "trend_3": trends[2],
+    }
+
+
+# ==================== Rendering ====================
+
+def render_report(kind: str, context: Dict) -> str:
+    """Render a "daily" or "weekly" report to an HTML string"""
+    return environment.get_template(REPORT_TEMPLATES[kind]).render(context)
+
+
+def stream_report(kind: str, context: Dict, buffer_size: int = 8) -> Iterator[str]:
+    """Render a report as a stream of HTML chunks (``buffer_size`` template events each)"""
+    stream = environment.get_template(REPORT_TEMPLATES[kind]).stream(context)
+    stream.enable_buffering(buffer_size)
+    return iter(stream)
+
+
+def _render_chunk(jobs: Sequence[Tuple[str, Dict]]) -> List[str]:
+    return [render_report(kind, context) for kind, context in jobs]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.REPORT_RENDER_WORKERS or os.cpu_count() or 1,
+            initializer=warm_templates
+        )
+    return _pool
+
+
+def render_reports(jobs: Sequence[Tuple[str, Dict]], chunk_size: int = 50) -> List[str]:
+    """
+    Render many (kind, context) reports, in order. Batches larger than one
+    chunk go to the worker pool, ``chunk_size`` reports per task so the
+    pickling overhead stays small next to the rendering work.
+    """
+    jobs = list(jobs)
+    workers = settings.REPORT_RENDER_WORKERS or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= chunk_size:
+        return _render_chunk(jobs)
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    rendered: List[str] = []
+    for chunk in _get_pool().map(_render_chunk, chunks):
+        rendered.extend(chunk)
+    return rendered
+
+
+async def render_reports_async(jobs: Sequence[Tuple[str, Dict]], chunk_size: int = 50) -> List[str]:
+    """render_reports() without blocking the event loop"""
+    jobs = list(jobs)
+    workers = settings.REPORT_RENDER_WORKERS or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= chunk_size:
+        return await asyncio.to_thread(_render_chunk, jobs)
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    chunks = await asyncio.gather(*[
+        loop.run_in_executor(pool, _render_chunk, jobs[i:i + chunk_size])
+        for i in range(0, len(jobs), chunk_size)
+    ])
+    return [html for chunk in chunks for html in chunk]
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,288 @@
+"""
+Detection storage layout and retention
+File: backend/app/services/retention.py
+
+- On PostgreSQL with Settings.DETECTIONS_PARTITIONED, the detections table
+  is created partitioned by RANGE(timestamp) with one partition per day,
+  so retention can drop whole days instead of deleting rows. Partitions
+  are premade at startup and then periodically (PartitionMaintainer);
+  rows that still landed in the DEFAULT partition move into their day's
+  partition when it is created.
+- compact_detections() removes raw detections older than the retention
+  window. Their per-minute and per-hour rollups (DetectionMinute /
+  DetectionHour, maintained as detections arrive) are kept; rows from
+  before the rollups existed are rolled up first.
+- upgrade_detection_storage() migrates a detections table created before
+  statuses were stored as SMALLINT codes.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, delete, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Base
+from app.models import Detection
+from app.services.rollups import backfill_rollups
+
+PARTITION_PREFIX = "detections_p"
+
+
+def partitioning_enabled(engine: Engine) -> bool:
+    return settings.DETECTIONS_PARTITIONED and engine.dialect.name == "postgresql"
+
+
+def init_detection_storage(engine: Engine):
+    """
+    Create the partitioned detections table (PostgreSQL only) before the
+    regular create_all() runs, which then leaves the existing table alone.
+    """
+    if not partitioning_enabled(engine):
+        return
+
+    others = [t for t in Base.metadata.sorted_tables if t.name != Detection.__tablename__]
+    Base.metadata.create_all(bind=engine, tables=others)
+
+    with engine.begin() as conn:
+        # The partition key has to be part of the primary key
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS detections (
+                id BIGSERIAL,
+                session_id INTEGER NOT NULL REFERENCES focus_sessions(id),
+                status SMALLINT NOT NULL,
+                focus_score DOUBLE PRECISION NOT NULL,
+                timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+                PRIMARY KEY (id, timestamp)
+            ) PARTITION BY RANGE (timestamp)
+        """))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_detections_session_time "
+            "ON detections (session_id, timestamp)"
+        ))
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {PARTITION_PREFIX}default "
+            "PARTITION OF detections DEFAULT"
+        ))
+    ensure_partitions(engine)
+
+
+# Legacy VARCHAR status (names, or codes written through StatusType) -> code
+LEGACY_STATUS_CODE = """
+    CASE lower(CAST(status AS TEXT))
+        WHEN 'focused' THEN 1 WHEN '1' THEN 1
+        WHEN 'distracted' THEN 2 WHEN '2' THEN 2
+        WHEN 'drowsy' THEN 3 WHEN '3' THEN 3
+        ELSE 0
+    END
+"""
+
+
+def upgrade_detection_storage(engine: Engine):
+    """
+    Bring a detections table created by an older release up to the current
+    schema: the VARCHAR status column becomes SMALLINT (existing values are
+    converted to DetectionStatus codes), NULL timestamps are filled in from
+    the session start, and the redundant ix_detections_id index is dropped.
+    Run after create_all(); a no-op on current databases.
+    """
+    columns = {c["name"]: c for c in inspect(engine).get_columns(Detection.__tablename__)}
+    legacy = not isinstance(columns["status"]["type"].as_generic(), Integer)
+
+    if legacy:
+        print("🔄 Migrating detections.status to SMALLINT codes...")
+        if engine.dialect.name == "sqlite":
+            _rebuild_sqlite_detections(engine)
+        else:
+            _alter_detections(engine)
+        print("✅ Detections table migrated")
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_detections_id"))
+
+
+def _alter_detections(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE detections SET timestamp = COALESCE("
+            "(SELECT start_time FROM focus_sessions WHERE focus_sessions.id = detections.session_id), "
+            "now() AT TIME ZONE 'utc') WHERE timestamp IS NULL"
+        ))
+        conn.execute(text(
+            f"ALTER TABLE detections "
+            f"ALTER COLUMN status TYPE SMALLINT USING ({LEGACY_STATUS_CODE}), "
+            f"ALTER COLUMN id TYPE BIGINT, "
+            f"ALTER COLUMN timestamp SET NOT NULL"
+        ))
+
+
+def _rebuild_sqlite_detections(engine: Engine):
+    """SQLite cannot change a column type in place; copy into a new table"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE detections RENAME TO detections_legacy"))
+        # Indexes follow the renamed table; free their names for the new one
+        indexes = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = 'detections_legacy' AND sql IS NOT NULL"
+        )).scalars().all()
+        for name in indexes:
+            conn.execute(text(f'DROP INDEX "{name}"'))
+
+        Detection.__table__.create(bind=conn)
+        conn.execute(text(f"""
+            INSERT INTO detections (id, session_id, status, focus_score, timestamp)
+            SELECT id, session_id, {LEGACY_STATUS_CODE}, focus_score,
+                   COALESCE(timestamp,
+                            (SELECT start_time FROM focus_sessions WHERE focus_sessions.id = detections_legacy.session_id),
+                            strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            FROM detections_legacy
+        """))
+        conn.execute(text("DROP TABLE detections_legacy"))
+
+
+def _partition_name(day: datetime) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _partition_names(conn) -> List[str]:
+    return conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'detections'"
+    )).scalars().all()
+
+
+def _create_partition(conn, day: datetime):
+    """
+    Create ``day``'s partition. PostgreSQL rejects it while the DEFAULT
+    partition holds rows of that day (written before the partition
+    existed), so DEFAULT is detached, those rows move into the new
+    partition and DEFAULT is attached again, all in one transaction.
+    """
+    name = _partition_name(day)
+    default = f"{PARTITION_PREFIX}default"
+    bounds = {"start": day, "end": day + timedelta(days=1)}
+    create = text(
+        f"CREATE TABLE {name} PARTITION OF detections "
+        f"FOR VALUES FROM ('{day:%Y-%m-%d}') TO ('{day + timedelta(days=1):%Y-%m-%d}')"
+    )
+
+    stranded = conn.execute(text(
+        f"SELECT 1 FROM {default} WHERE timestamp >= :start AND timestamp < :end LIMIT 1"
+    ), bounds).first()
+    if stranded is None:
+        conn.execute(create)
+        return
+
+    conn.execute(text(f"ALTER TABLE detections DETACH PARTITION {default}"))
+    conn.execute(create)
+    moved = conn.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {default} WHERE timestamp >= :start AND timestamp < :end "
+        f"RETURNING id, session_id, status, focus_score, timestamp) "
+        f"INSERT INTO {name} (id, session_id, status, focus_score, timestamp) "
+        f"SELECT id, session_id, status, focus_score, timestamp FROM moved"
+    ), bounds).rowcount
+    conn.execute(text(f"ALTER TABLE detections ATTACH PARTITION {default} DEFAULT"))
+    print(f"📦 Moved {moved} detections from the default partition into {name}")
+
+
+def ensure_partitions(engine: Engine, days_ahead: int = None):
+    """Create daily partitions from yesterday up to ``days_ahead`` days out"""
+    if not partitioning_enabled(engine):
+        return
+    if days_ahead is None:
+        days_ahead = settings.DETECTION_PARTITION_PREMAKE_DAYS
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    with engine.connect() as conn:
+        existing = set(_partition_names(conn))
+    for offset in range(-1, days_ahead + 1):
+        day = today + timedelta(days=offset)
+        if _partition_name(day) not in existing:
+            with engine.begin() as conn:
+                _create_partition(conn, day)
+
+
+class PartitionMaintainer:
+    """
+    Re-runs ensure_partitions() every DETECTION_PARTITION_MAINTENANCE_INTERVAL
+    seconds, so a long-running process always has tomorrow's partition
+    before the first detection of the day arrives
+    """
+
+    def __init__(self, interval: float = 3600.0):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.failures = 0
+
+    async def start(self, engine: Engine):
+        if self._task is None and partitioning_enabled(engine):
+            self._task = asyncio.create_task(self._run(engine))
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self, engine: Engine):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(ensure_partitions, engine)
+            except Exception as e:
+                self.failures += 1
+                print(f"❌ Partition maintenance failed: {e}")
+
+
+partition_maintainer = PartitionMaintainer(settings.DETECTION_PARTITION_MAINTENANCE_INTERVAL)
+
+
+def _expired_partitions(db: Session, cutoff: datetime) -> List[str]:
+    """Daily partitions whose whole day lies before ``cutoff``"""
+    expired = []
+    for name in _partition_names(db):
+        suffix = name[len(PARTITION_PREFIX):]
+        if not suffix.isdigit():
+            continue
+        day = datetime.strptime(suffix, "%Y%m%d")
+        if day + timedelta(days=1) <= cutoff:
+            expired.append(name)
+    return expired
+
+
+def compact_detections(db: Session, older_than: datetime = None) -> Dict:
+    """
+    Delete raw detections older than ``older_than`` (default: the retention
+    window). The sink maintains their minute/hour rollups as rows arrive;
+    rows that predate the rollups get their buckets written here before
+    they go. Commits.
+    """
+    if older_than is None:
+        older_than = datetime.utcnow() - timedelta(days=settings.DETECTION_RAW_RETENTION_DAYS)
+    # Align to a minute so a minute's raw rows go away together
+    cutoff = older_than.replace(second=0, microsecond=0)
+
+    buckets = backfill_rollups(db, cutoff)
+
+    dropped = []
+    if partitioning_enabled(db.get_bind()):
+        # Whole expired days go away with DROP TABLE instead of a huge DELETE
+        dropped = _expired_partitions(db, cutoff)
+        for name in dropped:
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    deleted = db.execute(delete(Detection).where(Detection.timestamp < cutoff)).rowcount
+    db.commit()
+
+    ensure_partitions(db.get_bind())
+    return {
+        "cutoff": cutoff.isoformat(),
+        "buckets_written": buckets,
+        "rows_deleted": deleted,
+        "partitions_dropped": dropped
+    }
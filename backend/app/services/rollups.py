@@ -0,0 +1,283 @@
+"""
+Per-minute and per-hour focus rollups
+File: backend/app/services/rollups.py
+
+The detection sink folds every flushed batch into DetectionMinute and
+DetectionHour buckets (counts by status, score sum/min/max, EAR sum) per
+session, tagged with the owning user. Timelines are served from these
+buckets, so their cost depends on the time range, not on how many frames
+a session produced.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, case, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import upsert_insert
+from app.models import Detection, DetectionMinute, DetectionHour, FocusSession
+
+COUNTED_STATUSES = ("focused", "distracted", "drowsy")
+
+RESOLUTIONS = {
+    "minute": (DetectionMinute, timedelta(minutes=1)),
+    "hour": (DetectionHour, timedelta(hours=1)),
+}
+
+# Ranges longer than this are served from hourly buckets in "auto" mode
+AUTO_MINUTE_SPAN = timedelta(hours=6)
+
+SUM_COLUMNS = ("focused", "distracted", "drowsy", "score_sum", "ear_sum", "ear_count")
+
+
+def _truncate(timestamp: datetime, resolution: str) -> datetime:
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def build_buckets(rows: Iterable[Dict], owners: Dict[int, int], resolution: str) -> List[Dict]:
+    """Aggregate detection rows into bucket rows for one resolution"""
+    buckets: Dict[tuple, Dict] = {}
+    for row in rows:
+        status = row["status"]
+        if status not in COUNTED_STATUSES:
+            continue
+        key = (row["session_id"], _truncate(row["timestamp"], resolution))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {
+                "session_id": key[0],
+                "bucket_start": key[1],
+                "user_id": owners[key[0]],
+                "focused": 0, "distracted": 0, "drowsy": 0,
+                "score_sum": 0.0, "score_min": None, "score_max": None,
+                "ear_sum": 0.0, "ear_count": 0
+            }
+        score = row["focus_score"]
+        bucket[status] += 1
+        bucket["score_sum"] += score
+        bucket["score_min"] = score if bucket["score_min"] is None else min(bucket["score_min"], score)
+        bucket["score_max"] = score if bucket["score_max"] is None else max(bucket["score_max"], score)
+        if row.get("ear") is not None:
+            bucket["ear_sum"] += row["ear"]
+            bucket["ear_count"] += 1
+    return list(buckets.values())
+
+
+def apply_rollups(db: Session, rows: List[Dict], owners: Dict[int, int]):
+    """
+    Add a batch of detection rows to the minute and hour rollups.
+    ``owners`` maps session id to user id. Does not commit.
+    """
+    dialect = db.get_bind().dialect.name
+    least = func.least if dialect == "postgresql" else func.min
+    greatest = func.greatest if dialect == "postgresql" else func.max
+
+    for resolution, (model, _) in RESOLUTIONS.items():
+        buckets = build_buckets(rows, owners, resolution)
+        if not buckets:
+            continue
+        table = model.__table__
+
+        stmt = upsert_insert(db, model)
+        if stmt is not None:
+            stmt = stmt.values(buckets)
+            excluded = stmt.excluded
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.session_id, table.c.bucket_start],
+                set_={
+                    **{column: table.c[column] + excluded[column] for column in SUM_COLUMNS},
+                    "score_min": least(func.coalesce(table.c.score_min, excluded.score_min),
+                                       excluded.score_min),
+                    "score_max": greatest(func.coalesce(table.c.score_max, excluded.score_max),
+                                          excluded.score_max),
+                }
+            )
+            db.execute(stmt)
+            continue
+
+        for bucket in buckets:
+            existing = db.get(model, (bucket["session_id"], bucket["bucket_start"]))
+            if existing is None:
+                db.add(model(**bucket))
+                continue
+            for column in SUM_COLUMNS:
+                setattr(existing, column, getattr(existing, column) + bucket[column])
+            existing.score_min = min(v for v in (existing.score_min, bucket["score_min"]) if v is not None)
+            existing.score_max = max(v for v in (existing.score_max, bucket["score_max"]) if v is not None)
+        db.flush()
+
+
+def _truncate_column(db: Session, column, resolution: str):
+    """SQL expression truncating a timestamp column to the minute or hour"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(resolution, column)
+    if resolution == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00.000000", column)
+    return func.strftime("%Y-%m-%d %H:%M:00.000000", column)
+
+
+def backfill_rollups(db: Session, before: datetime) -> int:
+    """
+    Roll raw detections older than ``before`` that have no bucket yet (rows
+    written before the rollups existed) into the minute and hour rollups.
+    Buckets the sink already maintains are left alone. Returns the number
+    of buckets written; does not commit.
+    """
+    written = 0
+    for resolution, (model, width) in RESOLUTIONS.items():
+        # Cover the whole bucket ``before`` falls in, so no bucket is
+        # written from a part of its rows
+        end = _truncate(before, resolution)
+        if end < before:
+            end += width
+        bucket = _truncate_column(db, Detection.timestamp, resolution)
+        scored = Detection.status.in_(COUNTED_STATUSES)
+        rollup = (
+            select(
+                Detection.session_id,
+                bucket,
+                FocusSession.user_id,
+                func.sum(case((Detection.status == "focused", 1), else_=0)),
+                func.sum(case((Detection.status == "distracted", 1), else_=0)),
+                func.sum(case((Detection.status == "drowsy", 1), else_=0)),
+                func.coalesce(func.sum(case((scored, Detection.focus_score), else_=0.0)), 0.0),
+                func.min(case((scored, Detection.focus_score))),
+                func.max(case((scored, Detection.focus_score))),
+            )
+            .join(FocusSession, FocusSession.id == Detection.session_id)
+            .where(
+                Detection.timestamp < end,
+                ~exists().where(and_(
+                    model.session_id == Detection.session_id,
+                    model.bucket_start == bucket
+                ))
+            )
+            .group_by(Detection.session_id, bucket, FocusSession.user_id)
+        )
+        result = db.execute(insert(model).from_select(
+            ["session_id", "bucket_start", "user_id", "focused", "distracted", "drowsy",
+             "score_sum", "score_min", "score_max"],
+            rollup
+        ))
+        written += max(result.rowcount, 0)
+    return written
+
+
+def pick_resolution(start: datetime, end: datetime, resolution: str = "auto") -> str:
+    if resolution in RESOLUTIONS:
+        return resolution
+    return "minute" if end - start <= AUTO_MINUTE_SPAN else "hour"
+
+
+def get_timeline(db: Session, user_id: int, start: datetime, end: datetime,
+                 session_id: Optional[int] = None, resolution: str = "auto",
+                 max_points: int = 240) -> Dict:
+    """
+    Focus timeline between ``start`` and ``end`` for a user, or for one of
+    their sessions. Buckets are merged into at most ``max_points`` points.
+    """
+    resolution = pick_resolution(start, end, resolution)
+    model, width = RESOLUTIONS[resolution]
+
+    query = db.query(
+        model.bucket_start,
+        func.sum(model.focused),
+        func.sum(model.distracted),
+        func.sum(model.drowsy),
+        func.sum(model.score_sum),
+        func.min(model.score_min),
+        func.max(model.score_max),
+        func.sum(model.ear_sum),
+        func.sum(model.ear_count),
+    ).filter(
+        model.user_id == user_id,
+        model.bucket_start >= _truncate(start, resolution),
+        model.bucket_start < end
+    )
+    if session_id is not None:
+        query = query.filter(model.session_id == session_id)
+    rows = query.group_by(model.bucket_start).order_by(model.bucket_start).all()
+
+    # Downsample: merge buckets into fixed windows of `step` bucket widths
+    span = max(end - start, width)
+    step = max(1, math.ceil(span / width / max(1, max_points)))
+    window = width * step
+    origin = _truncate(start, resolution)
+
+    points: List[Dict] = []
+    for (bucket_start, focused, distracted, drowsy, score_sum,
+         score_min, score_max, ear_sum, ear_count) in rows:
+        window_start = origin + window * ((bucket_start - origin) // window)
+        if not points or points[-1]["t"] != window_start:
+            points.append({
+                "t": window_start, "focused": 0, "distracted": 0, "drowsy": 0,
+                "score_sum": 0.0, "min_score": None, "max_score": None,
+                "ear_sum": 0.0, "ear_count": 0
+            })
+        point = points[-1]
+        point["focused"] += focused or 0
+        point["distracted"] += distracted or 0
+        point["drowsy"] += drowsy or 0
+        point["score_sum"] += score_sum or 0.0
+        point["ear_sum"] += ear_sum or 0.0
+        point["ear_count"] += ear_count or 0
+        if score_min is not None:
+            point["min_score"] = score_min if point["min_score"] is None else min(point["min_score"], score_min)
+        if score_max is not None:
+            point["max_score"] = score_max if point["max_score"] is None else max(point["max_score"], score_max)
+
+    for point in points:
+        count = point["focused"] + point["distracted"] + point["drowsy"]
+        score_sum = point.pop("score_sum")
+        ear_sum = point.pop("ear_sum")
+        ear_count = point.pop("ear_count")
+        point["t"] = point["t"].isoformat()
+        point["count"] = count
+        point["avg_score"] = round(score_sum / count, 2) if count else None
+        point["avg_ear"] = round(ear_sum / ear_count, 4) if ear_count else None
+
+    return {
+        "resolution": resolution,
+        "bucket_seconds": int(window.total_seconds()),
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "points": points
+    }
+
+
+def session_summaries(db: Session, session_ids: List[int]) -> Dict[int, Dict]:
+    """Per-session totals from the hourly rollups, for a page of sessions"""
+    if not session_ids:
+        return {}
+    rows = db.query(
+        DetectionHour.session_id,
+        func.sum(DetectionHour.focused),
+        func.sum(DetectionHour.distracted),
+        func.sum(DetectionHour.drowsy),
+        func.sum(DetectionHour.score_sum),
+        func.min(DetectionHour.score_min),
+        func.max(DetectionHour.score_max),
+        func.sum(DetectionHour.ear_sum),
+        func.sum(DetectionHour.ear_count),
+        func.count(),
+    ).filter(
+        DetectionHour.session_id.in_(session_ids)
+    ).group_by(DetectionHour.session_id).all()
+
+    summaries = {}
+    for (session_id, focused, distracted, drowsy, score_sum,
+         score_min, score_max, ear_sum, ear_count, hours) in rows:
+        count = (focused or 0) + (distracted or 0) + (drowsy or 0)
+        summaries[session_id] = {
+            "count": count,
+            "focus_ratio": round((focused or 0) / count, 4) if count else None,
+            "avg_score": round(score_sum / count, 2) if count else None,
+            "min_score": score_min,
+            "max_score": score_max,
+            "avg_ear": round(ear_sum / ear_count, 4) if ear_count else None,
+            "hours": hours,
+        }
+    return summaries
@@ -0,0 +1,78 @@
+"""
+Synthetic focus detector
+File: backend/app/services/synthetic_detector.py
+
+Stands in for FocusDetector when MediaPipe is unavailable, or for every
+session when Settings.DETECTOR_BACKEND is "synthetic" (load tests and
+capacity planning without cameras). Results come from a seeded random
+generator, so a run with the same SYNTHETIC_SEED replays the same statuses.
+Optionally decodes the frame and/or waits SYNTHETIC_LATENCY_MS to model
+the cost of real inference.
+"""
+import itertools
+import random
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+
+# Gives each detector its own stream when a seed is set
+_instance_ids = itertools.count()
+
+
+class SyntheticDetector:
+    """Seeded, configurable replacement for FocusDetector"""
+
+    def __init__(self, seed: Optional[int] = None, latency_ms: Optional[float] = None,
+                 decode: Optional[bool] = None):
+        if seed is None:
+            seed = settings.SYNTHETIC_SEED
+        if seed is not None:
+            seed += next(_instance_ids)
+        self._rng = random.Random(seed)
+        self.latency = (latency_ms if latency_ms is not None else settings.SYNTHETIC_LATENCY_MS) / 1000.0
+        self.decode = settings.SYNTHETIC_DECODE if decode is None else decode
+        self.focused_ratio = settings.SYNTHETIC_FOCUSED_RATIO
+        self.distracted_ratio = settings.SYNTHETIC_DISTRACTED_RATIO
+
+    def generate(self) -> Dict:
+        """One synthetic detection (by default 70% focused, 15% distracted, 15% drowsy)"""
+        rng = self._rng
+        rand = rng.random()
+
+        if rand < self.focused_ratio:
+            status = "focused"
+            score = rng.randint(75, 95)
+        elif rand < self.focused_ratio + self.distracted_ratio:
+            status = "distracted"
+            score = rng.randint(40, 65)
+        else:
+            status = "drowsy"
+            score = rng.randint(30, 50)
+
+        return {
+            "status": status,
+            "focus_score": score,
+            "timestamp": time.time()
+        }
+
+    def detect_focus(self, image_data: bytes, state=None) -> Dict:
+        # ``state`` is accepted for FocusDetector compatibility; synthetic
+        # results are not smoothed
+        if self.decode:
+            image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                return {
+                    "status": "error",
+                    "focus_score": 0,
+                    "message": "Invalid image"
+                }
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return self.generate()
+
+    def close(self):
+        pass
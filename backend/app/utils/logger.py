@@ -0,0 +1,29 @@
+"""
+Logging helpers
+File: backend/app/utils/logger.py
+"""
+import time
+from typing import Dict, Hashable
+
+from app.config import settings
+
+_last_logged: Dict[Hashable, float] = {}
+
+
+def log_sampled(key: Hashable, message: str, interval: float = None):
+    """
+    Print ``message`` at most once per ``interval`` seconds for ``key``
+    (default Settings.LOG_SAMPLE_INTERVAL). Used for per-frame events, which
+    would otherwise print on every frame of every connection.
+    """
+    if interval is None:
+        interval = settings.LOG_SAMPLE_INTERVAL
+    now = time.monotonic()
+    if now - _last_logged.get(key, float("-inf")) >= interval:
+        _last_logged[key] = now
+        print(message)
+
+
+def forget(key: Hashable):
+    """Drop the sampling state of a finished connection"""
+    _last_logged.pop(key, None)
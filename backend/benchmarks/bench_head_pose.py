@@ -0,0 +1,74 @@
+# bench_head_pose.py
+# Micro-benchmark of FocusDetector's head-pose stage (SQPnP on the six
+# POSE_ANCHORS landmarks), compared with iterative solvePnP seeded with the
+# previous frame's rvec/tvec. Landmarks are synthesised by projecting the
+# face model at a known pose, so no camera or face image is needed, and the
+# recovered angles are checked against that pose.
+# Usage: python benchmarks/bench_head_pose.py [iterations]
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+import timeit
+
+import cv2
+import numpy as np
+
+from app.services.detector import FocusDetector, POSE_MODEL_POINTS
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+W, H = 640, 480
+
+
+def project_face(detector, yaw: float, pitch: float, seed: int = 0) -> np.ndarray:
+    """Pixel coordinates of the pose anchors for a face at (yaw, pitch) degrees"""
+    rotation = (cv2.Rodrigues(np.array([math.radians(pitch), 0.0, 0.0]))[0] @
+                cv2.Rodrigues(np.array([0.0, math.radians(yaw), 0.0]))[0])
+    rvec = cv2.Rodrigues(rotation)[0]
+    tvec = np.array([[0.0], [0.0], [2000.0]])
+    points, _ = cv2.projectPoints(POSE_MODEL_POINTS, rvec, tvec,
+                                  detector._camera_matrix(W, H), detector._dist_coeffs)
+    # A pixel or so of landmark jitter
+    noise = np.random.default_rng(seed).normal(0.0, 0.7, size=(len(POSE_MODEL_POINTS), 2))
+    return np.ascontiguousarray(points.reshape(-1, 2) + noise)
+
+
+def sqpnp(detector, points):
+    """Current head-pose stage"""
+    return detector.estimate_head_pose(points, W, H)
+
+
+def make_seeded(detector, points):
+    """Iterative solvePnP starting from the previous frame's pose"""
+    camera = detector._camera_matrix(W, H)
+    _, rvec, tvec = cv2.solvePnP(POSE_MODEL_POINTS, points, camera, detector._dist_coeffs,
+                                 flags=cv2.SOLVEPNP_SQPNP)
+
+    def seeded(detector, points):
+        cv2.solvePnP(POSE_MODEL_POINTS, points, camera, detector._dist_coeffs,
+                     rvec.copy(), tvec.copy(), useExtrinsicGuess=True,
+                     flags=cv2.SOLVEPNP_ITERATIVE)
+    return seeded
+
+
+def main():
+    detector = FocusDetector()
+
+    print(f"Head pose accuracy (threshold {detector.head_pose_threshold:.0f} deg)")
+    for true_yaw, true_pitch in ((0, 0), (20, -10), (40, 0), (0, 35)):
+        yaw, pitch, _ = sqpnp(detector, project_face(detector, true_yaw, true_pitch))
+        away = max(abs(yaw), abs(pitch)) > detector.head_pose_threshold
+        print(f"  true yaw {true_yaw:>3} pitch {true_pitch:>3} -> "
+              f"yaw {yaw:6.1f} pitch {pitch:6.1f}  looking away: {away}")
+        assert abs(yaw - true_yaw) < 3 and abs(pitch - true_pitch) < 3
+
+    points = project_face(detector, 15, 5)
+    print(f"Head pose estimation, {ITERATIONS} iterations")
+    for name, fn in (("sqpnp", sqpnp), ("seeded", make_seeded(detector, points))):
+        seconds = min(timeit.repeat(lambda: fn(detector, points), number=ITERATIONS, repeat=3))
+        print(f"  {name:<11} {seconds / ITERATIONS * 1e6:8.2f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
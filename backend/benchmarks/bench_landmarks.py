@@ -0,0 +1,67 @@
+# bench_landmarks.py
+# Micro-benchmark of FocusDetector's per-frame landmark post-processing:
+# landmark extraction + EAR for both eyes, vectorized vs the previous
+# full 478-point Python loop. Does not need a camera or a face image.
+# Usage: python benchmarks/bench_landmarks.py [iterations]
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import timeit
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.detector import FocusDetector
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+W, H = 1280, 720
+
+
+def make_face_landmarks(seed: int = 0):
+    """FaceMesh-shaped result: 478 landmarks with normalised x/y/z"""
+    rng = np.random.default_rng(seed)
+    coords = rng.uniform(0.3, 0.7, size=(478, 3))
+    return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in coords])
+
+
+def legacy_postprocess(detector, face_landmarks, w, h):
+    """detect_focus post-processing before vectorization"""
+    landmarks = []
+    for landmark in face_landmarks.landmark:
+        landmarks.append([landmark.x * w, landmark.y * h])
+    landmarks = np.array(landmarks)
+
+    def calculate_ear(eye):
+        A = np.linalg.norm(eye[1] - eye[5])
+        B = np.linalg.norm(eye[2] - eye[4])
+        C = np.linalg.norm(eye[0] - eye[3])
+        return (A + B) / (2.0 * C)
+
+    left_eye = np.array([landmarks[i] for i in detector.LEFT_EYE])
+    right_eye = np.array([landmarks[i] for i in detector.RIGHT_EYE])
+    return (calculate_ear(left_eye) + calculate_ear(right_eye)) / 2.0
+
+
+def vectorized_postprocess(detector, face_landmarks, w, h):
+    """Current detect_focus post-processing"""
+    landmarks = detector.extract_landmarks(face_landmarks, w, h)
+    return float(detector.calculate_ears(landmarks[detector.EYES].reshape(2, 6, 2)).mean())
+
+
+def main():
+    detector = FocusDetector()
+
+    face = make_face_landmarks()
+    legacy = legacy_postprocess(detector, face, W, H)
+    vectorized = vectorized_postprocess(detector, face, W, H)
+    assert abs(legacy - vectorized) < 1e-9, (legacy, vectorized)
+
+    print(f"Landmark post-processing, {ITERATIONS} iterations")
+    for name, fn in (("legacy", legacy_postprocess), ("vectorized", vectorized_postprocess)):
+        seconds = min(timeit.repeat(lambda: fn(detector, face, W, H), number=ITERATIONS, repeat=3))
+        print(f"  {name:<11} {seconds / ITERATIONS * 1e6:8.2f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# bench_pipeline.py
+# Benchmark suite for the frame pipeline. Times each stage separately, for
+# fixture frames at several resolutions:
+#
+#   json_b64      json.loads + base64 data-URL decode (legacy JSON frames)
+#   binary        binary frame header parse (frame_protocol.decode_frame)
+#   imdecode      FocusDetector.decode_image (reduced-size JPEG decode)
+#   cvtcolor      BGR -> RGB conversion
+#   facemesh      FaceMesh.process on the decoded frame
+#   detect_focus  the whole FocusDetector.detect_focus call
+#   landmarks     landmark extraction + EAR for both eyes
+#   head_pose     solvePnP head pose
+#   state         FocusStateMachine.update
+#   db_write      DetectionSink batch write, per row
+#   json_reply    serialising the detection reply
+#   ws_roundtrip  one binary frame through /ws/focus to its reply, with the
+#                 synthetic detector backend (server-side handling only)
+#
+# Results (median us/op) can be saved as a baseline and compared against
+# it; stages slower than baseline * (1 + threshold) fail the run (exit 1).
+#
+# benchmarks/baselines/pipeline.json is the committed reference. CI
+# (.github/workflows/benchmarks.yml) benchmarks the base commit and the
+# pull request on the same runner and compares the two. Local numbers are
+# machine specific: --save writes baselines/pipeline.local.json (not
+# committed), which --compare then prefers over the reference.
+#
+# Usage:
+#   python benchmarks/bench_pipeline.py [--image face.jpg] [--save]
+#   python benchmarks/bench_pipeline.py --compare [--threshold 0.25]
+#   python benchmarks/bench_pipeline.py --compare --baseline other.json
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+
+# Isolated database and a server configured to measure handling overhead;
+# must be set before the app modules read their settings
+_tmpdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["DETECTOR_BACKEND"] = "synthetic"
+os.environ["SYNTHETIC_DECODE"] = "false"
+os.environ["SYNTHETIC_LATENCY_MS"] = "0"
+os.environ["FRAME_PROCESS_INTERVAL"] = "0"
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import statistics
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict
+
+import cv2
+import numpy as np
+
+from app.services.detector import FocusDetector
+from app.services.frame_protocol import encode_frame, decode_frame, decode_data_url
+
+RESOLUTIONS = {"480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+REFERENCE_PATH = os.path.join(BASELINE_DIR, "pipeline.json")
+LOCAL_BASELINE_PATH = os.path.join(BASELINE_DIR, "pipeline.local.json")
+
+
+def timeit_us(fn: Callable, min_time: float = 0.2, repeat: int = 5) -> float:
+    """Median microseconds per call over ``repeat`` runs of ~min_time seconds"""
+    fn()
+    started = time.perf_counter()
+    fn()
+    single = max(time.perf_counter() - started, 1e-7)
+    number = max(1, int(min_time / single))
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - started) / number)
+    return statistics.median(runs) * 1e6
+
+
+def make_frame(width: int, height: int, image_path: str = "") -> bytes:
+    """JPEG fixture: a resized photo if given, else a synthetic face-sized blob"""
+    if image_path:
+        image = cv2.resize(cv2.imread(image_path), (width, height))
+    else:
+        image = np.full((height, width, 3), 90, dtype=np.uint8)
+        cv2.ellipse(image, (width // 2, height // 2), (width // 6, height // 4),
+                    0, 0, 360, (150, 170, 200), -1)
+        noise = np.random.default_rng(0).integers(0, 20, image.shape, dtype=np.uint8)
+        image = cv2.add(image, noise)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+
+def bench_frame_stages(results: Dict, image_path: str):
+    detector = FocusDetector()
+    for name, (width, height) in RESOLUTIONS.items():
+        jpeg = make_frame(width, height, image_path)
+        text = json.dumps({"type": "frame",
+                           "data": "data:image/jpeg;base64," + base64.b64encode(jpeg).decode()})
+        binary = encode_frame(jpeg, 1, int(time.time() * 1000))
+        image = detector.decode_image(jpeg)
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        results[f"json_b64[{name}]"] = timeit_us(lambda: decode_data_url(json.loads(text)["data"]))
+        results[f"binary[{name}]"] = timeit_us(lambda: decode_frame(binary))
+        results[f"imdecode[{name}]"] = timeit_us(lambda: detector.decode_image(jpeg))
+        results[f"cvtcolor[{name}]"] = timeit_us(lambda: cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if detector.face_mesh is not None:
+            results[f"facemesh[{name}]"] = timeit_us(lambda: detector.face_mesh.process(rgb), repeat=3)
+        results[f"detect_focus[{name}]"] = timeit_us(lambda: detector.detect_focus(jpeg), repeat=3)
+    detector.close()
+
+
+def bench_landmark_stages(results: Dict):
+    detector = FocusDetector()
+    rng = np.random.default_rng(0)
+    face = SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z)
+                                     for x, y, z in rng.uniform(0.3, 0.7, size=(478, 3))])
+    w, h = RESOLUTIONS["480p"]
+
+    def landmarks():
+        points = detector.extract_landmarks(face, w, h)
+        return detector.calculate_ears(points[detector.EYES].reshape(2, 6, 2))
+
+    results["landmarks"] = timeit_us(landmarks)
+    # Project the face model at a mild pose for realistic solvePnP input
+    from app.services.detector import POSE_MODEL_POINTS
+    pose_points, _ = cv2.projectPoints(POSE_MODEL_POINTS, np.array([0.1, 0.2, 0.0]),
+                                       np.array([0.0, 0.0, 2000.0]),
+                                       detector._camera_matrix(w, h), detector._dist_coeffs)
+    pose_points = np.ascontiguousarray(pose_points.reshape(-1, 2))
+    results["head_pose"] = timeit_us(lambda: detector.estimate_head_pose(pose_points, w, h))
+
+    clock = iter(range(10 ** 9))
+    results["state"] = timeit_us(lambda: detector.state.update(0.27, next(clock) * 0.5))
+    detector.close()
+
+
+def bench_db_write(results: Dict, batch: int = 200):
+    from app.database import engine, Base, SessionLocal
+    from app.models import User, FocusSession
+    from app.services.detection_sink import DetectionSink
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(email="bench@example.com", username="bench", full_name="Bench",
+                hashed_password="x")
+    db.add(user)
+    db.commit()
+    session = FocusSession(user_id=user.id)
+    db.add(session)
+    db.commit()
+    session_id = session.id
+    db.close()
+
+    sink = DetectionSink(SessionLocal, flush_size=batch)
+    statuses = ("focused", "distracted", "drowsy")
+    rows = [{"session_id": session_id, "status": statuses[i % 3], "focus_score": 70.0,
+             "timestamp": datetime.utcnow(), "ear": 0.27} for i in range(batch)]
+    results["db_write"] = timeit_us(lambda: sink._write(rows), repeat=3) / batch
+
+
+def bench_json_reply(results: Dict):
+    response = {
+        "type": "detection", "status": "focused", "focus_score": 85,
+        "stats": {"totalFocused": 120, "totalDistracted": 14, "totalDrowsy": 3, "avgScore": 81},
+        "recommended_interval_ms": 500, "changed": False, "perclos": 0.05, "blinks": 12,
+        "frame_id": 4242
+    }
+    # Starlette's send_json serialisation
+    results["json_reply"] = timeit_us(
+        lambda: json.dumps(response, separators=(",", ":"), ensure_ascii=False).encode()
+    )
+
+
+def bench_ws_roundtrip(results: Dict, frames: int = 200):
+    from fastapi.testclient import TestClient
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+        with TestClient(main.app) as client:
+            client.post("/api/auth/register", json={
+                "email": "ws@example.com", "username": "wsbench",
+                "password": "bench-password", "full_name": "WS Bench"
+            })
+            token = client.post("/api/auth/login", data={
+                "username": "wsbench", "password": "bench-password"
+            }).json()["access_token"]
+
+            jpeg = make_frame(*RESOLUTIONS["480p"])
+            with client.websocket_connect(f"/ws/focus?token={token}") as ws:
+                ws.receive_json()
+                timings = []
+                for frame_id in range(frames):
+                    started = time.perf_counter()
+                    ws.send_bytes(encode_frame(jpeg, frame_id, int(time.time() * 1000)))
+                    while ws.receive_json().get("frame_id") != frame_id:
+                        pass
+                    timings.append(time.perf_counter() - started)
+    results["ws_roundtrip"] = statistics.median(timings[10:]) * 1e6
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> bool:
+    ok = True
+    print(f"\n📏 Against baseline (threshold +{threshold:.0%})")
+    for stage, value in results.items():
+        before = baseline.get(stage)
+        if before is None:
+            continue
+        change = value / before - 1
+        flag = "❌" if change > threshold else "  "
+        ok = ok and change <= threshold
+        print(f"  {flag} {stage:<22} {before:12.2f} -> {value:12.2f} us  ({change:+.1%})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame pipeline benchmarks")
+    parser.add_argument("--image", default="", help="face photo used for the fixture frames")
+    parser.add_argument("--save", action="store_true", help="save results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare with the saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--baseline", default="",
+                        help="baseline file (default: the local one if saved, else the reference)")
+    args = parser.parse_args()
+    save_path = args.baseline or LOCAL_BASELINE_PATH
+    baseline_path = args.baseline or (
+        LOCAL_BASELINE_PATH if os.path.exists(LOCAL_BASELINE_PATH) else REFERENCE_PATH
+    )
+
+    results: Dict[str, float] = {}
+    print("⏱️ Frame stages...")
+    bench_frame_stages(results, args.image)
+    print("⏱️ Landmark stages...")
+    bench_landmark_stages(results)
+    print("⏱️ Database write...")
+    bench_db_write(results)
+    bench_json_reply(results)
+    print("⏱️ WebSocket round trip...")
+    bench_ws_roundtrip(results)
+
+    print("\n📊 Median us/op")
+    for stage, value in results.items():
+        print(f"  {stage:<22} {value:12.2f}")
+
+    ok = True
+    if args.compare:
+        if not os.path.exists(baseline_path):
+            sys.exit(f"❌ No baseline at {baseline_path}; run with --save first")
+        print(f"\n📂 Baseline: {baseline_path}")
+        with open(baseline_path) as f:
+            ok = compare(results, json.load(f), args.threshold)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+        with open(save_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Baseline saved to {save_path}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
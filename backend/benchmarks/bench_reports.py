@@ -0,0 +1,80 @@
+# bench_reports.py
+# Per-report render cost of the daily/weekly email templates: compiling the
+# template on every call (the old Template(SOURCE).render path) against the
+# shared, precompiled Environment in app/services/reports.py, plus a batch
+# of reports rendered inline vs. on the process pool.
+# Usage: python benchmarks/bench_reports.py [iterations] [batch_size]
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import timeit
+
+from jinja2 import Template
+
+from app.services import reports
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+BATCH_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+USER = {"name": "Grace", "email": "grace@example.com"}
+DAILY_STATS = {
+    "total_sessions": 6, "total_duration": "3h 20m", "avg_score": 78.4,
+    "best_score": 91, "peak_hour": "10:00 AM",
+}
+WEEKLY_STATS = {
+    "week_range": "Oct 12 - Oct 18", "total_sessions": 23, "total_hours": 14.5,
+    "avg_score": 74.2, "streak": 5,
+    "week_data": [{"name": day, "percentage": 40 + 8 * i}
+                  for i, day in enumerate(("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"))],
+    "achievements": [{"title": "Deep Worker", "description": "Five sessions over 80%"}],
+}
+
+
+def source(kind):
+    with open(os.path.join(reports.TEMPLATE_DIR, reports.REPORT_TEMPLATES[kind]), encoding="utf-8") as f:
+        return f.read()
+
+
+def main():
+    contexts = {
+        "daily": reports.daily_report_context(USER, DAILY_STATS),
+        "weekly": reports.weekly_report_context(USER, WEEKLY_STATS),
+    }
+
+    started = time.perf_counter()
+    reports.warm_templates()
+    print(f"Template warm-up: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"Per-report render cost, {ITERATIONS} iterations")
+    for kind, context in contexts.items():
+        text = source(kind)
+        cases = (
+            ("compile+render", lambda: Template(text).render(context)),
+            ("cached", lambda: reports.render_report(kind, context)),
+            ("streamed", lambda: "".join(reports.stream_report(kind, context))),
+        )
+        for name, fn in cases:
+            seconds = min(timeit.repeat(fn, number=ITERATIONS, repeat=3))
+            print(f"  {kind:<7}{name:<16} {seconds / ITERATIONS * 1e6:9.1f} us/report")
+
+    jobs = [("daily" if i % 2 else "weekly", contexts["daily" if i % 2 else "weekly"])
+            for i in range(BATCH_SIZE)]
+    print(f"Batch of {BATCH_SIZE} reports")
+    started = time.perf_counter()
+    reports._render_chunk(jobs)
+    inline = time.perf_counter() - started
+    print(f"  inline        {inline:7.2f} s ({inline / BATCH_SIZE * 1e6:.1f} us/report)")
+
+    reports.render_reports(jobs[:200])  # start the pool outside the timing
+    started = time.perf_counter()
+    rendered = reports.render_reports(jobs)
+    pooled = time.perf_counter() - started
+    print(f"  process pool  {pooled:7.2f} s ({pooled / BATCH_SIZE * 1e6:.1f} us/report)")
+    assert len(rendered) == BATCH_SIZE
+    reports.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# loadgen.py
+# Load generator for /ws/focus. Registers (or logs in) one user per
+# connection against a running server, opens N authenticated WebSocket
+# connections and streams binary JPEG frames at a fixed rate on each, then
+# reports round-trip latency percentiles (frame sent -> detection reply
+# with the same frame_id) and throughput.
+#
+# Frames come from a directory of recorded JPEGs (--frames) or are
+# synthesised. Run the server with DETECTOR_BACKEND=synthetic (and e.g.
+# SYNTHETIC_LATENCY_MS=15) to size deployments without MediaPipe or cameras.
+# The server samples frames latest-frame-wins, so frames sent faster than
+# FRAME_PROCESS_INTERVAL are dropped by design and reported as such.
+#
+# Usage: python benchmarks/loadgen.py --connections 50 --fps 2 --duration 30
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import glob
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, List
+
+import cv2
+import numpy as np
+import websockets
+
+from app.services.frame_protocol import encode_frame
+
+
+def load_frames(directory: str, width: int, height: int, count: int = 30) -> List[bytes]:
+    """Recorded JPEGs from ``directory``, or synthetic face-sized frames"""
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, "*.jp*g")))
+        if not paths:
+            sys.exit(f"❌ No JPEG files in {directory}")
+        frames = []
+        for path in paths:
+            with open(path, "rb") as f:
+                frames.append(f.read())
+        return frames
+
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        image = np.full((height, width, 3), 90, dtype=np.uint8)
+        cv2.ellipse(image, (width // 2 + i % 7, height // 2), (width // 6, height // 4),
+                    0, 0, 360, (150, 170, 200), -1)
+        image = cv2.add(image, rng.integers(0, 20, image.shape, dtype=np.uint8))
+        frames.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+    return frames
+
+
+def get_token(base_url: str, username: str, password: str) -> str:
+    """Register the load-test user if needed and log in"""
+    body = json.dumps({
+        "email": f"{username}@loadtest.example.com",
+        "username": username,
+        "password": password,
+        "full_name": "Load Test"
+    }).encode()
+    request = urllib.request.Request(f"{base_url}/api/auth/register", data=body,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        urllib.request.urlopen(request).close()
+    except urllib.error.HTTPError as e:
+        if e.code != 400:  # 400 = already registered
+            raise
+
+    form = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    with urllib.request.urlopen(f"{base_url}/api/auth/login", data=form) as response:
+        return json.load(response)["access_token"]
+
+
+async def run_connection(ws_url: str, token: str, frames: List[bytes], fps: float,
+                         deadline: float, stats: Dict):
+    """Stream frames on one connection until ``deadline``"""
+    sent_at: Dict[int, float] = {}
+
+    async with websockets.connect(f"{ws_url}/ws/focus?token={token}", max_size=None) as ws:
+        async def receive():
+            async for message in ws:
+                reply = json.loads(message)
+                if reply.get("type") == "error":
+                    stats["errors"] += 1
+                    continue
+                started = sent_at.pop(reply.get("frame_id"), None)
+                if reply.get("type") == "detection" and started is not None:
+                    stats["latencies"].append(time.perf_counter() - started)
+                    stats["replies"] += 1
+
+        receiver = asyncio.create_task(receive())
+        interval = 1.0 / fps
+        frame_id = 0
+        next_send = time.perf_counter()
+        try:
+            while next_send < deadline:
+                frame = frames[frame_id % len(frames)]
+                sent_at[frame_id] = time.perf_counter()
+                await ws.send(encode_frame(frame, frame_id, int(time.time() * 1000)))
+                stats["sent"] += 1
+                frame_id += 1
+                next_send += interval
+                await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+            # Give in-flight frames a moment to come back
+            await asyncio.sleep(min(2.0, 4 * interval))
+        finally:
+            receiver.cancel()
+
+
+async def main(args):
+    base_url = args.url.rstrip("/")
+    ws_url = "ws" + base_url[len("http"):]
+    frames = load_frames(args.frames, args.width, args.height)
+    print(f"🖼️ {len(frames)} frames, avg {sum(map(len, frames)) // len(frames)} bytes")
+
+    print(f"🔐 Authenticating {args.connections} users...")
+    tokens = await asyncio.gather(*(
+        asyncio.to_thread(get_token, base_url, f"{args.user_prefix}{i}", args.password)
+        for i in range(args.connections)
+    ))
+
+    stats = {"sent": 0, "replies": 0, "errors": 0, "latencies": []}
+    print(f"🚀 {args.connections} connections x {args.fps} fps for {args.duration}s")
+    started = time.perf_counter()
+    deadline = started + args.duration
+    results = await asyncio.gather(*(
+        run_connection(ws_url, token, frames, args.fps, deadline, stats)
+        for token in tokens
+    ), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    failed = [r for r in results if isinstance(r, Exception)]
+    for error in failed[:3]:
+        print(f"❌ Connection failed: {error!r}")
+
+    latencies = np.array(stats["latencies"]) * 1000.0
+    print(f"\n📊 Results ({elapsed:.1f}s)")
+    print(f"  connections  {args.connections - len(failed)} ok, {len(failed)} failed")
+    print(f"  frames sent  {stats['sent']} ({stats['sent'] / elapsed:.1f}/s)")
+    print(f"  replies      {stats['replies']} ({stats['replies'] / elapsed:.1f}/s), "
+          f"{stats['sent'] - stats['replies']} dropped by sampling, {stats['errors']} errors")
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"  latency ms   p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {latencies.max():.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket load generator for /ws/focus")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--fps", type=float, default=2.0, help="frames per second per connection")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--frames", default="", help="directory of recorded JPEG frames")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--user-prefix", default="loadtest_")
+    parser.add_argument("--password", default="loadtest-password")
+    asyncio.run(main(parser.parse_args()))
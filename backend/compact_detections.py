@@ -0,0 +1,31 @@
+# compact_detections.py
+# Delete raw detections older than the retention window; their minute and
+# hour rollups are kept. Run daily (cron / scheduled job).
+# Usage: python compact_detections.py [retention_days]
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.database import engine, Base, SessionLocal
+from app.services.retention import (
+    init_detection_storage, upgrade_detection_storage, compact_detections
+)
+
+days = int(sys.argv[1]) if len(sys.argv) > 1 else settings.DETECTION_RAW_RETENTION_DAYS
+
+init_detection_storage(engine)
+Base.metadata.create_all(bind=engine)
+upgrade_detection_storage(engine)
+
+db = SessionLocal()
+try:
+    print(f"🗜️ Compacting detections older than {days} days...")
+    result = compact_detections(db, datetime.utcnow() - timedelta(days=days))
+    print(f"✅ {result['buckets_written']} buckets backfilled, "
+          f"{result['rows_deleted']} raw rows deleted, "
+          f"{len(result['partitions_dropped'])} partitions dropped")
+finally:
+    db.close()
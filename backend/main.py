@@ -3,14 +3,17 @@
 Focus Guardian Backend - Main Entry Point
 File location: backend/main.py (NOT backend/app/main.py)
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import timedelta, datetime
 from pydantic import BaseModel
+from typing import Optional
 import json
-import base64
+import asyncio
 import traceback
 import sys
 import os
@@ -18,27 +21,29 @@ import os
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import engine, get_db, Base
+from app.config import settings
+from app.database import engine, get_db, Base, SessionLocal, run_in_session, dispose_engines, ensure_indexes
 from app.models import User, FocusSession, Detection
+from app.services.analytics import add_user_stats, get_user_stats, backfill_user_stats
+from app.services import passwords
+from app.services.retention import (
+    init_detection_storage, upgrade_detection_storage, partition_maintainer
+)
+from app.routes import stats as stats_routes
+from app.routes import export as export_routes
+from app.utils.helpers import TTLCache
+from app.utils.logger import log_sampled, forget
+from app.utils.metrics import STAGE_SECONDS, Counter, Gauge, render_metrics
 from app.auth import (
-    get_password_hash, 
-    verify_password, 
     create_access_token, 
     get_current_user,
+    get_user_by_token,
+    invalidate_user,
     ACCESS_TOKEN_EXPIRE_MINUTES,
-    SECRET_KEY,
-    ALGORITHM
+    token_cache,
+    user_cache
 )
-try:
-    from app.services.detector import FocusDetector
-    focus_detector = FocusDetector()
-    DETECTOR_AVAILABLE = True
-except ImportError:
-    focus_detector = None
-    DETECTOR_AVAILABLE = False
-    print("⚠️ Running without AI detector (mediapipe not available)")
 from pydantic import BaseModel, EmailStr
-from jose import jwt
 
 # ⚠️ TEMPORARY: Reset database schema (REMOVE AFTER FIRST RUN)
 #print("🔄 Resetting database schema...")
@@ -47,9 +52,18 @@ from jose import jwt
 
 # Create database tables
 print("🗄️ Creating database tables...")
+init_detection_storage(engine)
 Base.metadata.create_all(bind=engine)
+upgrade_detection_storage(engine)
+ensure_indexes(engine)
 print("✅ Database tables created")
 
+# Users from before the user_stats rollup existed
+with SessionLocal() as _db:
+    _backfilled = backfill_user_stats(_db)
+if _backfilled:
+    print(f"✅ Backfilled user stats for {_backfilled} users")
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Focus Guardian API",
@@ -66,24 +80,70 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
-# Initialize focus detector
-print("🧠 Initializing focus detector...")
-DETECTOR_ENABLED = False
-focus_detector = None
+# Routers
+app.include_router(stats_routes.router)
+app.include_router(export_routes.router)
+# Report emails go out from send_reports.py (scheduled); the on-demand
+# /api/reports/send-daily router in app/email_services.py is not mounted
 
+# Check the focus detector is importable. Detectors themselves are built
+# per session by the inference workers' DetectorPool.
+print("🧠 Initializing focus detector...")
 try:
     from app.services.detector import FocusDetector
-    focus_detector = FocusDetector()
     DETECTOR_ENABLED = True
-    print("✅ Focus detector ready")
+    if settings.DETECTOR_BACKEND == "synthetic":
+        print(f"🎲 Synthetic detector backend (seed: {settings.SYNTHETIC_SEED})")
+    else:
+        print("✅ Focus detector ready")
 except ImportError as e:
     print(f"⚠️ Running without AI detector (mediapipe not available)")
     DETECTOR_ENABLED = False
-    focus_detector = None
-except Exception as e:
-    print(f"⚠️ Focus detector initialization failed: {e}")
-    DETECTOR_ENABLED = False
-    focus_detector = None
+
+# Detection runs in a worker pool so the event loop keeps serving other sockets
+from app.services.inference import InferenceExecutor
+from app.services.frame_protocol import decode_frame, decode_data_url
+from app.services.admission import FrameAdmission, totals as frame_totals
+inference_executor = InferenceExecutor(
+    mode=settings.INFERENCE_EXECUTOR,
+    max_workers=settings.INFERENCE_WORKERS,
+    detector_pool_size=settings.DETECTOR_POOL_SIZE
+)
+print(f"⚙️ Inference executor: {inference_executor.mode} pool, {inference_executor.max_workers} workers")
+
+# Detections are buffered and written in batches instead of per frame
+from app.services.detection_sink import DetectionSink
+detection_sink = DetectionSink(
+    SessionLocal,
+    max_queue=settings.DETECTION_QUEUE_SIZE,
+    flush_size=settings.DETECTION_FLUSH_SIZE,
+    flush_interval=settings.DETECTION_FLUSH_INTERVAL
+)
+
+# Per-connection session totals, checkpointed to focus_sessions periodically
+from app.services.live_session import LiveSessionTracker
+from app.services.mailer import mail_queue
+from app.services import reports
+live_sessions = LiveSessionTracker(interval=settings.LIVE_SESSION_CHECKPOINT_INTERVAL)
+
+@app.on_event("startup")
+async def start_detection_sink():
+    await detection_sink.start()
+    await live_sessions.start()
+    await mail_queue.start()
+    await partition_maintainer.start(engine)
+    reports.warm_templates()
+
+@app.on_event("shutdown")
+async def shutdown_pipeline():
+    await detection_sink.stop()
+    await live_sessions.stop()
+    await mail_queue.stop()
+    await partition_maintainer.stop()
+    reports.shutdown()
+    inference_executor.shutdown()
+    passwords.shutdown()
+    await dispose_engines()
 
 # ==================== Pydantic Models ====================
 
@@ -120,38 +180,50 @@ class XPUpdate(BaseModel):
     level: int
 # ==================== WebSocket Manager ====================
 
+# Database work of the WebSocket path, run through run_in_session() so
+# it never blocks the event loop that serves the other sockets
+
+def authenticate_token(db: Session, token: str):
+    """(user id, username) for a valid token, or None"""
+    user = get_user_by_token(token, db)
+    return (user.id, user.username) if user else None
+
+def start_focus_session(db: Session, user_id: int) -> int:
+    session = FocusSession(user_id=user_id)
+    db.add(session)
+    add_user_stats(db, user_id, total_sessions=1)
+    db.flush()
+    session_id = session.id
+    db.commit()
+    return session_id
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: dict = {}
     
-    async def connect(self, websocket: WebSocket, user_id: int, db: Session):
+    async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
         
-        # Create new focus session
-        session = FocusSession(user_id=user_id)
-        db.add(session)
-        db.commit()
-        db.refresh(session)
+        # Create new focus session (off the event loop)
+        session_id = await run_in_session(start_focus_session, user_id)
         
         self.active_connections[websocket] = {
-            'session_id': session.id,
-            'user_id': user_id
+            'session_id': session_id,
+            'user_id': user_id,
+            'live': live_sessions.open(session_id, user_id)
         }
         
-        print(f"✅ WebSocket connected: User {user_id}, Session {session.id}")
+        print(f"✅ WebSocket connected: User {user_id}, Session {session_id}")
         
-        return session.id
+        return session_id
     
-    def disconnect(self, websocket: WebSocket, db: Session):
+    async def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             connection_info = self.active_connections[websocket]
             session_id = connection_info['session_id']
             
-            # End the session
-            session = db.query(FocusSession).filter(FocusSession.id == session_id).first()
-            if session:
-                session.end_time = datetime.utcnow()
-                db.commit()
+            # Write the final totals and end the session
+            if await live_sessions.close(session_id):
                 print(f"🛑 Session {session_id} ended")
             
             del self.active_connections[websocket]
@@ -164,6 +236,38 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+# ==================== Metrics ====================
+
+# Read at scrape time from the components that already count them
+Gauge("focus_ws_active_connections", "Open /ws/focus connections",
+      source=lambda: len(manager.active_connections))
+for _event in ("offered", "processed", "dropped", "expired"):
+    Counter(f"focus_frames_{_event}_total", f"Frames {_event} by per-connection admission",
+            source=lambda _event=_event: frame_totals[_event])
+Gauge("focus_inference_queue_depth", "Frames waiting for or in inference",
+      source=lambda: inference_executor.queue_depth)
+Counter("focus_inference_failed_total", "Detections that raised",
+        source=lambda: inference_executor.failed)
+Gauge("focus_db_queue_depth", "Detections buffered for the database",
+      source=lambda: detection_sink.get_stats()["queue_depth"])
+Counter("focus_db_rows_written_total", "Detection rows written",
+        source=lambda: detection_sink.rows_written)
+Counter("focus_db_rows_failed_total", "Detection rows lost to failed flushes",
+        source=lambda: detection_sink.rows_failed)
+Counter("focus_session_checkpoints_total", "Batched focus_sessions checkpoints written",
+        source=lambda: live_sessions.checkpoints)
+Counter("focus_session_checkpoint_failures_total", "focus_sessions checkpoints that failed",
+        source=lambda: live_sessions.failures)
+Gauge("focus_mail_queue_depth", "Emails waiting for an SMTP connection",
+      source=lambda: mail_queue.get_stats()["queue_depth"])
+Counter("focus_mail_sent_total", "Emails sent", source=lambda: mail_queue.sent)
+Counter("focus_mail_failed_total", "Emails that finally failed", source=lambda: mail_queue.failed)
+for _name, _cache in (("token", token_cache), ("user", user_cache)):
+    Counter(f"focus_auth_{_name}_cache_hits_total", f"Authentications served from the {_name} cache",
+            source=lambda _cache=_cache: _cache.hits)
+    Counter(f"focus_auth_{_name}_cache_misses_total", f"Authentications that missed the {_name} cache",
+            source=lambda _cache=_cache: _cache.misses)
+
 # ==================== API Routes ====================
 
 @app.get("/")
@@ -176,14 +280,14 @@ def read_root():
     }
 
 @app.post("/api/auth/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     print(f"📝 Registration attempt: {user.username}")
     
     # Check if user already exists
-    existing_user = db.query(User).filter(
+    existing_user = await run_in_threadpool(db.query(User).filter(
         (User.email == user.email) | (User.username == user.username)
-    ).first()
+    ).first)
     
     if existing_user:
         print(f"❌ User already exists: {user.username}")
@@ -192,8 +296,8 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             detail="Email or username already registered"
         )
     
-    # Create new user with all fields
-    hashed_password = get_password_hash(user.password)
+    # Create new user with all fields (the slow KDF runs in its own pool)
+    hashed_password = await passwords.hash_password(user.password)
     new_user = User(
         email=user.email,
         username=user.username,
@@ -205,8 +309,8 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     
     try:
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await run_in_threadpool(db.commit)
+        await run_in_threadpool(db.refresh, new_user)
         
         print(f"✅ User registered successfully: {new_user.username} (ID: {new_user.id})")
         
@@ -215,65 +319,20 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         db.rollback()
         print(f"❌ Registration error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-# Add this with your other routes
-@app.put("/api/auth/update-profile")
-def update_profile(
-    username: str = None,
-    email: str = None,
-    full_name: str = None,
-    current_password: str = None,
-    new_password: str = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Update user profile"""
-    try:
-        # Update basic info
-        if username:
-            current_user.username = username
-        if email:
-            current_user.email = email
-        if full_name:
-            current_user.full_name = full_name
-        
-        # Update password if provided
-        if new_password and current_password:
-            if not verify_password(current_password, current_user.hashed_password):
-                raise HTTPException(status_code=400, detail="Current password is incorrect")
-            current_user.hashed_password = get_password_hash(new_password)
-        
-        db.commit()
-        return {"message": "Profile updated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-    # Create new user
-    hashed_password = get_password_hash(user.password)
-    new_user = User(
-        email=user.email,
-        username=user.username,
-        full_name=user.full_name,
-        hashed_password=hashed_password
-    )
-    
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    print(f"✅ User registered successfully: {new_user.username}")
-    
-    return new_user
 
 @app.post("/api/auth/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login user and return access token"""
     print(f"🔐 Login attempt: {form_data.username}")
     
     # Find user
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await run_in_threadpool(
+        db.query(User).filter(User.username == form_data.username).first
+    )
     
     if not user:
         print(f"❌ User not found: {form_data.username}")
+        await passwords.dummy_verify()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -281,7 +340,8 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         )
     
     # Verify password
-    if not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await passwords.verify_password(form_data.password, user.hashed_password)
+    if not valid:
         print(f"❌ Invalid password for: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -289,14 +349,24 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    username = user.username
+    
+    # Upgrade legacy (unsalted SHA-256) or outdated hashes now that we have
+    # the plain password
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+        invalidate_user(username)
+        print(f"🔑 Password hash upgraded for: {username}")
+    
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, 
+        data={"sub": username}, 
         expires_delta=access_token_expires
     )
     
-    print(f"✅ Login successful: {user.username}")
+    print(f"✅ Login successful: {username}")
     
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -312,56 +382,100 @@ def read_users_me(current_user: User = Depends(get_current_user)):
         "level": getattr(current_user, 'level', 1)}
 
 @app.get("/api/stats", response_model=SessionStats)
-def get_stats(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get user's focus statistics"""
-    sessions = db.query(FocusSession).filter(
-        FocusSession.user_id == current_user.id
-    ).all()
-    
-    total_focused = sum(s.total_focused for s in sessions)
-    total_distracted = sum(s.total_distracted for s in sessions)
-    total_drowsy = sum(s.total_drowsy for s in sessions)
-    avg_score = sum(s.avg_score for s in sessions) / len(sessions) if sessions else 0
+async def get_stats(current_user: User = Depends(get_current_user)):
+    """Get user's focus statistics (from the user_stats rollup)"""
+    stats = await run_in_session(get_user_stats, current_user.id)
     
     return {
-        "total_focused": total_focused,
-        "total_distracted": total_distracted,
-        "total_drowsy": total_drowsy,
-        "avg_score": avg_score
+        "total_focused": stats["total_focused"],
+        "total_distracted": stats["total_distracted"],
+        "total_drowsy": stats["total_drowsy"],
+        "avg_score": stats["avg_score"]
     }
 
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics (connections, frame rates, stage latencies, DB flushes)"""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/inference/stats")
+def get_inference_stats():
+    """Inference executor queue depth and latency metrics"""
+    return inference_executor.get_stats()
+
 # ==================== Users Endpoint (NEW) ====================
 
-# Add this to your main.py, replacing the existing /api/users endpoint
+# Short-lived cache of leaderboard pages, cleared whenever XP or profiles change
+users_page_cache = TTLCache(maxsize=256, ttl=settings.USERS_CACHE_TTL)
+
+def encode_users_cursor(xp: int, user_id: int) -> str:
+    return f"{xp}:{user_id}"
+
+def decode_users_cursor(cursor: str):
+    try:
+        xp, user_id = cursor.split(":")
+        return int(xp), int(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @app.get("/api/users")
 def get_all_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    q: Optional[str] = Query(None, max_length=100),
     current_user: User = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
-    """Get all registered users for social features"""
-    try:
-        users = db.query(User).all()
+    """
+    Get registered users for social features, highest XP first.
+    
+    Returns one page; pass the X-Next-Cursor response header back as
+    ``cursor`` to fetch the next one. ``q`` keeps only users whose
+    username or full name contains it (case-insensitive).
+    """
+    q = (q or "").strip().lower()
+    cache_key = (cursor, limit, q)
+    cached = users_page_cache.get(cache_key)
+    if cached is None:
+        query = db.query(
+            User.id, User.username, User.email, User.full_name,
+            User.created_at, User.xp, User.level
+        )
+        if q:
+            query = query.filter(
+                func.lower(User.username).contains(q, autoescape=True) |
+                func.lower(func.coalesce(User.full_name, "")).contains(q, autoescape=True)
+            )
+        if cursor:
+            last_xp, last_id = decode_users_cursor(cursor)
+            query = query.filter(
+                (User.xp < last_xp) | ((User.xp == last_xp) & (User.id > last_id))
+            )
+        rows = query.order_by(User.xp.desc(), User.id).limit(limit + 1).all()
         
-        result = []
-        for user in users:
-            user_data = {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "full_name": user.full_name,
-                "created_at": user.created_at.isoformat() if hasattr(user, 'created_at') and user.created_at else None,
-                "xp": getattr(user, 'xp', 0),
-                "level": getattr(user, 'level', 1)
-            }
-            result.append(user_data)
-            print(f"📊 User {user.username}: XP={user_data['xp']}, Level={user_data['level']}")
+        result = [{
+            "id": row.id,
+            "username": row.username,
+            "email": row.email,
+            "full_name": row.full_name,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "xp": row.xp or 0,
+            "level": row.level or 1
+        } for row in rows[:limit]]
         
-        return result
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_users_cursor(last.xp or 0, last.id)
         
-    except Exception as e:
-        print(f"❌ Error fetching users: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        cached = (result, next_cursor)
+        users_page_cache.set(cache_key, cached)
+    
+    result, next_cursor = cached
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return result
 
 class UpdateProfileRequest(BaseModel):
     username: str = None
@@ -371,12 +485,13 @@ class UpdateProfileRequest(BaseModel):
     new_password: str = None
 
 @app.put("/api/auth/update-profile")
-def update_profile(
+async def update_profile(
     update_data: UpdateProfileRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update user profile"""
+    previous_username = current_user.username
     try:
         # Update basic info
         if update_data.username:
@@ -388,12 +503,20 @@ def update_profile(
         
         # Update password if provided
         if update_data.new_password and update_data.current_password:
-            if not verify_password(update_data.current_password, current_user.hashed_password):
+            valid, _ = await passwords.verify_password(
+                update_data.current_password, current_user.hashed_password
+            )
+            if not valid:
                 raise HTTPException(status_code=400, detail="Current password is incorrect")
-            current_user.hashed_password = get_password_hash(update_data.new_password)
+            current_user.hashed_password = await passwords.hash_password(update_data.new_password)
         
-        db.commit()
+        await run_in_threadpool(db.commit)
+        invalidate_user(previous_username, current_user.username)
+        users_page_cache.clear()
         return {"message": "Profile updated successfully"}
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -410,6 +533,8 @@ def update_user_xp(
         current_user.level = xp_data.level
         db.commit()
         db.refresh(current_user)
+        invalidate_user(current_user.username)
+        users_page_cache.clear()
         
         print(f"✅ Updated XP for {current_user.username}: XP={xp_data.xp}, Level={xp_data.level}")
         
@@ -437,21 +562,18 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
     
     print(f"Token: {token[:20]}...")
     
-    db = next(get_db())
-    
     try:
-        # Verify JWT token
+        # Verify JWT token (cached, shared with the REST endpoints)
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub")
-            current_user = db.query(User).filter(User.username == username).first()
+            identity = await run_in_session(authenticate_token, token)
             
-            if not current_user:
+            if not identity:
                 print("❌ Invalid token - user not found")
                 await websocket.close(code=1008, reason="Invalid token")
                 return
-                
-            print(f"✅ User authenticated: {current_user.username}")
+            
+            user_id, username = identity
+            print(f"✅ User authenticated: {username}")
             
         except Exception as e:
             print(f"❌ Token verification failed: {e}")
@@ -459,8 +581,8 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
             return
         
         # Connect WebSocket and create session
-        session_id = await manager.connect(websocket, current_user.id, db)
-        session = db.query(FocusSession).filter(FocusSession.id == session_id).first()
+        session_id = await manager.connect(websocket, user_id)
+        live = manager.active_connections[websocket]['live']
         
         # Send connection success message
         await manager.send_personal_message({
@@ -468,75 +590,96 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
             "message": "WebSocket connected successfully"
         }, websocket)
         
+        # Frames are admitted latest-frame-wins and processed by a separate
+        # task, so stale frames are dropped when inference falls behind
+        admission = FrameAdmission(
+            base_interval=settings.FRAME_PROCESS_INTERVAL,
+            max_interval=settings.FRAME_MAX_INTERVAL,
+            max_age=settings.FRAME_MAX_AGE,
+            stable_frames=settings.FRAME_STABLE_STREAK
+        )
+        
+        async def process_frames():
+            while True:
+                image_bytes, frame_id = await admission.next_frame()
+                try:
+                    # Detect focus status (off the event loop, in frame order)
+                    with STAGE_SECONDS.time(stage="inference"):
+                        result = await inference_executor.detect(image_bytes, key=session_id)
+                    log_sampled(session_id, f"🎯 Session {session_id} detection: "
+                                            f"{result['status']} (score: {result['focus_score']})")
+                    
+                    # Update this connection's running statistics (written
+                    # to focus_sessions by the periodic checkpoint)
+                    live.record(result["status"], result["focus_score"])
+                    
+                    # Queue the detection; rows and user counters are
+                    # written to the database in batches by the sink
+                    with STAGE_SECONDS.time(stage="db_enqueue"):
+                        await detection_sink.put(
+                            session_id, result["status"], result["focus_score"],
+                            ear=result.get("ear")
+                        )
+                    
+                    # Adapt sampling to load and to how stable the state is
+                    admission.record(result["status"], inference_executor.load)
+                    
+                    # Send response back to client
+                    response = {
+                        "type": "detection",
+                        "status": result["status"],
+                        "focus_score": result["focus_score"],
+                        "stats": live.stats(),
+                        "recommended_interval_ms": int(admission.interval * 1000)
+                    }
+                    # Smoothed-state details (absent for mock detections)
+                    for key in ("changed", "perclos", "blinks"):
+                        if key in result:
+                            response[key] = result[key]
+                    if frame_id is not None:
+                        response["frame_id"] = frame_id
+                    
+                    with STAGE_SECONDS.time(stage="send"):
+                        await manager.send_personal_message(response, websocket)
+                    
+                except Exception as e:
+                    print(f"❌ Error processing frame: {e}")
+                    print(traceback.format_exc())
+                    await manager.send_personal_message({
+                        "type": "error",
+                        "message": str(e)
+                    }, websocket)
+        
+        processor = asyncio.create_task(process_frames())
+        
         # Main message loop
         try:
             while True:
-                # Receive message from client
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                # Receive message from client: binary frames, or JSON
+                # messages (including legacy base64 frames)
+                data = await websocket.receive()
+                if data["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(data.get("code", 1000))
+                
+                binary_frame = data.get("bytes")
+                if binary_frame is not None:
+                    message = {"type": "frame"}
+                else:
+                    message = json.loads(data["text"])
                 
                 if message.get("type") == "frame":
                     try:
-                        # Extract and decode base64 image
-                        image_data_str = message.get("data", "")
-                        if "," in image_data_str:
-                            image_data_str = image_data_str.split(",")[1]
-                        
-                        image_bytes = base64.b64decode(image_data_str)
-                        print(f"📸 Frame received: {len(image_bytes)} bytes")
-                        
-                        # Detect focus status
-                        result = focus_detector.detect_focus(image_bytes)
-                        print(f"🎯 Detection: {result['status']} (score: {result['focus_score']})")
-                        
-                        # Update session statistics
-                        if result["status"] == "focused":
-                            session.total_focused += 1
-                        elif result["status"] == "distracted":
-                            session.total_distracted += 1
-                        elif result["status"] == "drowsy":
-                            session.total_drowsy += 1
-                        
-                        # Calculate running average score
-                        total_detections = (session.total_focused + 
-                                          session.total_distracted + 
-                                          session.total_drowsy)
-                        
-                        if total_detections > 0:
-                            session.avg_score = (
-                                (session.avg_score * (total_detections - 1)) + 
-                                result["focus_score"]
-                            ) / total_detections
-                        
-                        db.commit()
-                        
-                        # Save individual detection
-                        detection = Detection(
-                            session_id=session_id,
-                            status=result["status"],
-                            focus_score=result["focus_score"]
-                        )
-                        db.add(detection)
-                        db.commit()
-                        
-                        # Send response back to client
-                        response = {
-                            "type": "detection",
-                            "status": result["status"],
-                            "focus_score": result["focus_score"],
-                            "stats": {
-                                "totalFocused": session.total_focused,
-                                "totalDistracted": session.total_distracted,
-                                "totalDrowsy": session.total_drowsy,
-                                "avgScore": int(session.avg_score)
-                            }
-                        }
-                        
-                        await manager.send_personal_message(response, websocket)
+                        frame_id = None
+                        with STAGE_SECONDS.time(stage="decode"):
+                            if binary_frame is not None:
+                                header, image_bytes = decode_frame(binary_frame)
+                                frame_id = header["frame_id"]
+                            else:
+                                image_bytes = decode_data_url(message.get("data", ""))
+                        admission.offer(image_bytes, frame_id)
                         
                     except Exception as e:
-                        print(f"❌ Error processing frame: {e}")
-                        print(traceback.format_exc())
+                        print(f"❌ Error decoding frame: {e}")
                         await manager.send_personal_message({
                             "type": "error",
                             "message": str(e)
@@ -544,7 +687,15 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
                         
         except WebSocketDisconnect:
             print("🔌 Client disconnected")
-            manager.disconnect(websocket, db)
+        finally:
+            # However the loop ended (disconnect, malformed message, ...):
+            # stop the processor first so nothing touches the session after
+            processor.cancel()
+            await asyncio.gather(processor, return_exceptions=True)
+            inference_executor.release(session_id)
+            forget(session_id)
+            await detection_sink.flush()
+            await manager.disconnect(websocket)
             
     except Exception as e:
         print(f"❌ WebSocket error: {e}")
@@ -553,8 +704,6 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
             await websocket.close()
         except:
             pass
-    finally:
-        db.close()
 
 # ==================== Startup ====================
 
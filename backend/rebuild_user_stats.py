@@ -0,0 +1,22 @@
+# rebuild_user_stats.py
+# Backfill or repair the user_stats rollup from focus_sessions.
+# Usage: python rebuild_user_stats.py [user_id]
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine, Base, SessionLocal
+from app.services.analytics import rebuild_user_stats
+
+user_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+    target = f"user {user_id}" if user_id is not None else "all users"
+    print(f"🔄 Rebuilding user stats for {target}...")
+    rows = rebuild_user_stats(db, user_id)
+    print(f"✅ Rebuilt {rows} user stats rows")
+finally:
+    db.close()
@@ -0,0 +1,42 @@
+# send_reports.py
+# Render and email the daily or weekly focus report of every user who had a
+# session in the period. Run nightly (cron / scheduled job) after midnight UTC.
+# Usage: python send_reports.py daily|weekly [--date YYYY-MM-DD] [--dry-run]
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import asyncio
+from datetime import date
+
+from app.config import settings
+from app.database import engine, Base
+from app.services import reports
+from app.services.mailer import mail_queue
+from app.services.report_job import REPORT_KINDS, run_report_job
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Send daily / weekly focus reports")
+    parser.add_argument("kind", choices=REPORT_KINDS)
+    parser.add_argument("--date", type=date.fromisoformat, default=None,
+                        help="last day of the report period (default: yesterday, UTC)")
+    parser.add_argument("--chunk-size", type=int, default=settings.REPORT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="render the reports but send nothing")
+    return parser.parse_args()
+
+
+async def main(args):
+    reports.warm_templates()
+    try:
+        await run_report_job(args.kind, day=args.date, chunk_size=args.chunk_size,
+                             send=not args.dry_run)
+    finally:
+        await mail_queue.stop()
+        reports.shutdown()
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,114 @@
+# smtp_debug_server.py
+# Minimal local SMTP server for testing email delivery: accepts every
+# message and prints its envelope and subject instead of delivering it.
+# Supports connection reuse (RSET / several MAIL transactions per session)
+# but not STARTTLS or AUTH, so run the backend with
+#   SMTP_SERVER=localhost SMTP_PORT=1025 SMTP_STARTTLS=false
+# Usage: python smtp_debug_server.py [port] [--quiet]
+#
+# Tests import it and call start_server(); the ``faults`` dict then makes
+# it answer MAIL with temporary failures or drop connections on purpose.
+import asyncio
+import sys
+from email.parser import BytesHeaderParser, BytesParser
+
+quiet = False
+
+stats = {"connections": 0, "messages": 0}
+# Accepted messages (email.message.Message), in arrival order
+received = []
+# tempfail: MAIL commands still to answer with 451
+# drop_after: close each connection after this many messages
+faults = {"tempfail": 0, "drop_after": None}
+
+
+def reset():
+    stats.update(connections=0, messages=0)
+    received.clear()
+    faults.update(tempfail=0, drop_after=None)
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    stats["connections"] += 1
+    sender, recipients = None, []
+    accepted = 0
+
+    async def reply(line: str):
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    await reply("220 focus-guardian debug SMTP ready")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+
+            if verb in ("EHLO", "HELO"):
+                await reply("250-localhost\r\n250-8BITMIME\r\n250 SMTPUTF8" if verb == "EHLO" else "250 localhost")
+            elif verb == "MAIL":
+                if faults["tempfail"] > 0:
+                    faults["tempfail"] -= 1
+                    await reply("451 Try again later")
+                    continue
+                sender, recipients = command[10:].split(" ")[0].strip("<>"), []
+                await reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].split(" ")[0].strip("<>"))
+                await reply("250 OK")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = await reader.readline()
+                    if data in (b".\r\n", b".\n", b""):
+                        break
+                    # RFC 5321 4.5.2: drop the first dot of every line that starts with one
+                    lines.append(data[1:] if data.startswith(b".") else data)
+                raw = b"".join(lines)
+                received.append(BytesParser().parsebytes(raw))
+                headers = BytesHeaderParser().parsebytes(raw)
+                stats["messages"] += 1
+                accepted += 1
+                if not quiet:
+                    print(f"📨 #{stats['messages']} {sender} -> {', '.join(recipients)}: "
+                          f"{headers.get('Subject', '')}")
+                sender, recipients = None, []
+                await reply("250 OK: queued")
+                if faults["drop_after"] is not None and accepted >= faults["drop_after"]:
+                    break
+            elif verb in ("RSET", "NOOP"):
+                sender, recipients = (None, []) if verb == "RSET" else (sender, recipients)
+                await reply("250 OK")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+    finally:
+        writer.close()
+
+
+async def start_server(port: int = 1025) -> asyncio.AbstractServer:
+    """Listen on 127.0.0.1 (port 0 picks a free one)"""
+    return await asyncio.start_server(handle, "127.0.0.1", port)
+
+
+async def main(port: int):
+    server = await start_server(port)
+    print(f"📬 Debug SMTP server on 127.0.0.1:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        print(f"📊 {stats['messages']} messages over {stats['connections']} connections")
+
+
+if __name__ == "__main__":
+    quiet = "--quiet" in sys.argv
+    try:
+        asyncio.run(main(int(next((arg for arg in sys.argv[1:] if arg.isdigit()), 1025))))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,74 @@
+"""
+FaceMesh landmarks found on the face ROI must match a fresh full-frame
+detection, including right after the ROI moves (the tracking state of the
+previous region must not leak into the next one).
+Run from backend/: python -m pytest tests
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+mp = pytest.importorskip("mediapipe")
+cbook = pytest.importorskip("matplotlib.cbook")
+
+import numpy as np
+
+from app.services.detector import FocusDetector
+
+FRAME_W, FRAME_H = 1000, 700
+FACE_W, FACE_H = 384, 450
+
+# Face positions: small moves keep the ROI, jumps force a new one
+OFFSETS = [(100, 80), (104, 82), (108, 84), (500, 90), (504, 92),
+           (40, 150), (44, 150), (560, 200), (564, 204), (100, 80), (104, 80)]
+
+
+@pytest.fixture(scope="module")
+def face():
+    with cbook.get_sample_data("grace_hopper.jpg") as f:
+        image = cv2.imdecode(np.frombuffer(f.read(), np.uint8), cv2.IMREAD_COLOR)
+    return cv2.resize(image, (FACE_W, FACE_H))
+
+
+def frame_with_face(face, x, y):
+    frame = np.full((FRAME_H, FRAME_W, 3), 90, np.uint8)
+    frame[y:y + FACE_H, x:x + FACE_W] = face
+    return frame
+
+
+def test_roi_landmarks_match_full_frame_across_crop_changes(face):
+    detector = FocusDetector(max_dim=FRAME_W, roi_padding=0.3)
+    if not detector.mp_available:
+        pytest.skip("MediaPipe not available")
+    reference = mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True, max_num_faces=1, refine_landmarks=True
+    )
+
+    regions = []
+    try:
+        for x, y in OFFSETS:
+            frame = frame_with_face(face, x, y)
+            results, offset, (roi_w, roi_h) = detector._find_face(frame)
+            assert results.multi_face_landmarks, f"no face at {(x, y)}"
+            landmarks = detector.extract_landmarks(
+                results.multi_face_landmarks[0], roi_w, roi_h, offset
+            ).copy()
+            detector._update_roi(landmarks[detector.BOUNDS], FRAME_W, FRAME_H)
+
+            expected = reference.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            expected = detector.extract_landmarks(
+                expected.multi_face_landmarks[0], FRAME_W, FRAME_H
+            )
+            error = np.abs(landmarks - expected).max()
+            assert error < 0.03 * FACE_W, f"landmarks off by {error:.1f}px at {(x, y)}"
+            regions.append((offset, (roi_w, roi_h)))
+    finally:
+        reference.close()
+        detector.close()
+
+    # The face was found on several different ROIs, not only on full frames
+    crops = {region for region in regions if region[0] != (0, 0)}
+    assert len(crops) >= 3
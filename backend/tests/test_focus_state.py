@@ -0,0 +1,102 @@
+"""
+FocusStateMachine at the frame rates clients actually send: the 2s base
+capture interval (FocusMode.jsx), slower rates under load, and a fast
+10 fps stream.
+Run from backend/: python -m pytest tests
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.focus_state import FocusStateMachine
+
+OPEN = 0.30
+CLOSED = 0.10
+
+
+def feed(machine, ears, interval, start=0.0):
+    """Feed EAR samples ``interval`` seconds apart; returns every result"""
+    results = []
+    for i, ear in enumerate(ears):
+        results.append(machine.update(ear, start + i * interval))
+    return results
+
+
+def test_open_eyes_stay_focused_at_base_interval():
+    machine = FocusStateMachine()
+    results = feed(machine, [OPEN] * 40, 2.0)
+    assert all(r["status"] == "focused" for r in results)
+    assert machine.interval == 2.0
+
+
+def test_no_blinks_reported_when_sampling_is_too_slow():
+    machine = FocusStateMachine()
+    results = feed(machine, [OPEN, CLOSED, OPEN, CLOSED, OPEN] * 4, 2.0)
+    assert all(r["blinks"] is None for r in results)
+
+
+def test_perclos_withheld_until_samples_cover_half_the_window():
+    machine = FocusStateMachine()
+    results = feed(machine, [OPEN] * 20, 2.0)
+    # 30s of a 60s window: the 16th sample, 30s after the first
+    assert all(r["perclos"] is None for r in results[:15])
+    assert all(r["perclos"] == 0.0 for r in results[15:])
+
+
+def test_single_closed_sample_at_base_interval_is_not_drowsy():
+    machine = FocusStateMachine()
+    results = feed(machine, [OPEN] * 10 + [CLOSED] + [OPEN] * 5, 2.0)
+    assert all(r["status"] != "drowsy" for r in results)
+
+
+def test_two_closed_samples_at_base_interval_do_not_skip_hysteresis():
+    machine = FocusStateMachine()
+    results = feed(machine, [OPEN] * 10 + [CLOSED] * 2 + [OPEN] * 5, 2.0)
+    assert all(r["status"] != "drowsy" for r in results)
+
+
+def test_sustained_closure_at_base_interval_turns_drowsy():
+    machine = FocusStateMachine()
+    results = feed(machine, [OPEN] * 10 + [CLOSED] * 3, 2.0)
+    assert machine.drowsy_samples == 3
+    assert [r["status"] for r in results[-3:]] == ["focused", "focused", "drowsy"]
+    assert results[-1]["changed"]
+
+
+def test_drowsy_needs_more_closed_samples_when_sampling_is_fast():
+    machine = FocusStateMachine()
+    feed(machine, [OPEN] * 20, 0.1)
+    # 1.5s of closure at 10 fps spans 16 samples
+    assert machine.drowsy_samples == 16
+    results = feed(machine, [CLOSED] * 15, 0.1, start=2.0)
+    assert all(r["status"] == "focused" for r in results)
+    result = machine.update(CLOSED, 2.0 + 15 * 0.1)
+    assert result["status"] == "drowsy"
+
+
+def test_blinks_counted_at_fast_interval_without_status_change():
+    machine = FocusStateMachine()
+    ears = ([OPEN] * 10 + [CLOSED] * 2) * 5 + [OPEN] * 10
+    results = feed(machine, ears, 0.1)
+    assert results[-1]["blinks"] == 5
+    assert all(r["status"] == "focused" for r in results)
+
+
+def test_leaving_drowsy_waits_for_perclos_to_recover():
+    machine = FocusStateMachine()
+    feed(machine, [OPEN] * 20 + [CLOSED] * 6, 2.0)
+    assert machine.status == "drowsy"
+    # PERCLOS over the 60s window stays above the exit threshold for a while
+    results = feed(machine, [OPEN] * 30, 2.0, start=52.0)
+    statuses = [r["status"] for r in results]
+    assert results[0]["perclos"] > machine.perclos_exit
+    assert statuses[-1] == "focused"
+    recovered = statuses.index("focused")
+    assert all(r["perclos"] > machine.perclos_exit for r in results[:recovered - machine.hold])
+
+
+def test_slower_interval_under_load_keeps_minimum_closed_samples():
+    machine = FocusStateMachine()
+    results = feed(machine, [OPEN] * 10 + [CLOSED] * 2, 4.0)
+    assert machine.drowsy_samples == 3
+    assert results[-1]["status"] != "drowsy"
@@ -0,0 +1,58 @@
+"""
+InferenceExecutor.release while a frame of the closed connection is still
+running in a worker thread.
+Run from backend/: python -m pytest tests
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+
+from app.services import inference
+from app.services.detector_pool import DetectorPool
+
+
+class BlockingDetector:
+    """Holds every frame until ``proceed`` is set"""
+
+    started = threading.Event()
+    proceed = threading.Event()
+
+    def detect_focus(self, image_data, state=None):
+        self.started.set()
+        self.proceed.wait(5)
+        return {"status": "focused", "focus_score": 90}
+
+    def close(self):
+        pass
+
+
+def test_release_evicts_after_running_frame():
+    pool = DetectorPool(max_size=4, factory=BlockingDetector)
+    saved, inference._detector_pool = inference._detector_pool, pool
+    executor = inference.InferenceExecutor("thread", max_workers=2, detector_pool_size=4)
+
+    async def main():
+        frame = asyncio.ensure_future(executor.detect(b"frame", "session-1"))
+        await asyncio.to_thread(BlockingDetector.started.wait, 5)
+        # The WebSocket handler cancels its processor, then releases
+        frame.cancel()
+        await asyncio.gather(frame, return_exceptions=True)
+        executor.release("session-1")
+        assert pool.get_stats()["leased"] == 1
+
+        BlockingDetector.proceed.set()
+        for _ in range(100):
+            if pool.get_stats()["size"] == 0:
+                break
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(main())
+        assert pool.get_stats()["size"] == 0
+        assert "session-1" not in inference._session_states
+    finally:
+        executor.shutdown()
+        inference._detector_pool = saved
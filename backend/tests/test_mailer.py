@@ -0,0 +1,147 @@
+"""
+MailQueue against the local stand-in server (smtp_debug_server.py):
+batching over one connection, retry with backoff, and reconnecting after
+the server drops the connection.
+Run from backend/: python -m pytest tests
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import smtplib
+import time
+
+import smtp_debug_server
+
+from app.services.mailer import MailQueue, SMTPConnection, build_message
+
+smtp_debug_server.quiet = True
+
+
+def run(scenario, **options):
+    """Run ``scenario(queue)`` with a fresh server and queue; returns its result"""
+    async def main():
+        smtp_debug_server.reset()
+        server = await smtp_debug_server.start_server(0)
+        port = server.sockets[0].getsockname()[1]
+        queue = MailQueue("127.0.0.1", port, starttls=False, timeout=5.0,
+                          **{"max_connections": 1, **options})
+        await queue.start()
+        try:
+            return await scenario(queue)
+        finally:
+            await queue.stop()
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(main())
+
+
+def message(n, body="<p>report</p>"):
+    return build_message(f"user{n}@example.com", f"Report {n}", body,
+                         from_email="noreply@example.com")
+
+
+async def send_all(queue, count):
+    done = [await queue.enqueue(message(n)) for n in range(count)]
+    return await asyncio.gather(*done)
+
+
+def test_batch_shares_one_connection():
+    results = run(lambda queue: send_all(queue, 10))
+
+    assert results == [True] * 10
+    assert smtp_debug_server.stats == {"connections": 1, "messages": 10}
+    assert [m["Subject"] for m in smtp_debug_server.received] == [f"Report {n}" for n in range(10)]
+
+
+def test_temporary_failure_is_retried_with_backoff():
+    async def scenario(queue):
+        smtp_debug_server.faults["tempfail"] = 2
+        started = time.monotonic()
+        sent = await queue.send(message(1))
+        return sent, time.monotonic() - started, queue.get_stats()
+
+    sent, elapsed, stats = run(scenario, retry_backoff=0.05)
+
+    assert sent is True
+    assert stats["retried"] == 2 and stats["failed"] == 0
+    # 0.05s, then 0.1s
+    assert elapsed >= 0.15
+    # A 451 only resets the transaction; the connection is kept
+    assert smtp_debug_server.stats == {"connections": 1, "messages": 1}
+
+
+def test_gives_up_after_max_retries():
+    async def scenario(queue):
+        smtp_debug_server.faults["tempfail"] = 10
+        return await queue.send(message(1)), queue.get_stats()
+
+    sent, stats = run(scenario, retry_backoff=0.01, max_retries=2)
+
+    assert sent is False
+    assert stats["retried"] == 2 and stats["failed"] == 1
+    assert smtp_debug_server.stats["messages"] == 0
+
+
+def test_reconnects_after_server_drops_connection():
+    async def scenario(queue):
+        smtp_debug_server.faults["drop_after"] = 1
+        return await send_all(queue, 3), queue.get_stats()
+
+    results, stats = run(scenario, retry_backoff=0.01)
+
+    assert results == [True] * 3
+    assert stats["failed"] == 0
+    assert smtp_debug_server.stats == {"connections": 3, "messages": 3}
+
+
+def test_leading_dots_survive_transfer():
+    body = "<p>x</p>\n.hidden\n..double\n"
+
+    async def scenario(queue):
+        return await queue.send(message(1, body))
+
+    assert run(scenario) is True
+    html = smtp_debug_server.received[0].get_payload()[1].get_payload(decode=True).decode()
+    assert ".hidden\n..double" in html.replace("\r\n", "\n")
+
+
+def test_server_unstuffs_every_leading_dot():
+    async def main():
+        smtp_debug_server.reset()
+        server = await smtp_debug_server.start_server(0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write(b"HELO t\r\nMAIL FROM:<a@b>\r\nRCPT TO:<c@d>\r\nDATA\r\n"
+                     b"Subject: dots\r\n\r\n..two\r\n.one\r\n.\r\nQUIT\r\n")
+        await writer.drain()
+        await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+    assert smtp_debug_server.received[0].get_payload().splitlines() == [".two", "one"]
+
+
+def test_failed_reconnect_does_not_keep_connection():
+    async def main():
+        smtp_debug_server.reset()
+        server = await smtp_debug_server.start_server(0)
+        connection = SMTPConnection("127.0.0.1", server.sockets[0].getsockname()[1],
+                                    starttls=False, timeout=5.0)
+        smtp_debug_server.faults["drop_after"] = 1
+        await asyncio.to_thread(connection.send, message(1))
+        # The resend on the fresh connection fails too
+        smtp_debug_server.faults["tempfail"] = 1
+        try:
+            await asyncio.to_thread(connection.send, message(2))
+        except smtplib.SMTPSenderRefused as e:
+            error = e
+        server.close()
+        await server.wait_closed()
+        return error, connection.is_open
+
+    error, is_open = asyncio.run(main())
+    assert error.smtp_code == 451
+    assert is_open is False
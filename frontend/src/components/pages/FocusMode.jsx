@@ -7,6 +7,27 @@ import { PomodoroTimer } from '../features/PomodoroTimer';
 import { FocusPet } from '../features/FocusPet';
 import { MusicPlayer } from '../features/MusicPlayer';
 
+// Binary frame message: version, codec, frame id, timestamp (ms), JPEG bytes.
+// Must match backend/app/services/frame_protocol.py
+const FRAME_PROTOCOL_VERSION = 1;
+const FRAME_CODEC_JPEG = 1;
+const FRAME_HEADER_SIZE = 14;
+
+// Base capture rate (one frame every 2s); the server may ask for slower
+const BASE_CAPTURE_INTERVAL_MS = 2000;
+
+const encodeFrame = async (blob, frameId) => {
+  const image = new Uint8Array(await blob.arrayBuffer());
+  const buffer = new ArrayBuffer(FRAME_HEADER_SIZE + image.length);
+  const header = new DataView(buffer);
+  header.setUint8(0, FRAME_PROTOCOL_VERSION);
+  header.setUint8(1, FRAME_CODEC_JPEG);
+  header.setUint32(2, frameId >>> 0);
+  header.setBigUint64(6, BigInt(Date.now()));
+  new Uint8Array(buffer, FRAME_HEADER_SIZE).set(image);
+  return buffer;
+};
+
 export const FocusModePage = () => {
   const [isTracking, setIsTracking] = useState(false);
   const [cameraError, setCameraError] = useState(null);
@@ -14,11 +35,18 @@ export const FocusModePage = () => {
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
   const captureIntervalRef = useRef(null);
+  const frameIdRef = useRef(0);
   
   const { token } = useContext(AuthContext);
   const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
   const wsUrl = API_URL.replace('http://', 'ws://').replace('https://', 'wss://') + '/ws/focus';
-  const { focusData, wsStatus, sendMessage } = useFocusTracker(wsUrl);
+  const { focusData, wsStatus, sendBinary, captureInterval } = useFocusTracker(wsUrl);
+  const captureDelayRef = useRef(BASE_CAPTURE_INTERVAL_MS);
+
+  // The server's recommendation can only slow capture below the base rate
+  useEffect(() => {
+    captureDelayRef.current = Math.min(Math.max(captureInterval, BASE_CAPTURE_INTERVAL_MS), 10000);
+  }, [captureInterval]);
   const { onFocusDetection, onSessionComplete } = useContext(GamificationContext);
   
   const startCamera = async () => {
@@ -63,8 +91,10 @@ export const FocusModePage = () => {
     canvas.height = video.videoHeight;
     context.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-    const frameData = canvas.toDataURL('image/jpeg', 0.8);
-    sendMessage({ type: 'frame', data: frameData });
+    canvas.toBlob(async (blob) => {
+      if (!blob) return;
+      sendBinary(await encodeFrame(blob, frameIdRef.current++));
+    }, 'image/jpeg', 0.8);
   };
 
   const handleStartTracking = async () => {
@@ -82,7 +112,15 @@ export const FocusModePage = () => {
 
     await startCamera();
     setIsTracking(true);
-    captureIntervalRef.current = setInterval(captureFrame, 2000);
+    scheduleCapture();
+  };
+
+  // Re-armed after every capture so the server's recommended interval applies
+  const scheduleCapture = () => {
+    captureIntervalRef.current = setTimeout(() => {
+      captureFrame();
+      scheduleCapture();
+    }, captureDelayRef.current);
   };
 
   const handleStopTracking = () => {
@@ -90,7 +128,7 @@ export const FocusModePage = () => {
     setIsTracking(false);
     
     if (captureIntervalRef.current) {
-      clearInterval(captureIntervalRef.current);
+      clearTimeout(captureIntervalRef.current);
       captureIntervalRef.current = null;
     }
     
@@ -101,7 +139,7 @@ export const FocusModePage = () => {
   useEffect(() => {
     return () => {
       if (captureIntervalRef.current) {
-        clearInterval(captureIntervalRef.current);
+        clearTimeout(captureIntervalRef.current);
       }
       stopCamera();
     };
@@ -5,6 +5,27 @@ import { AuthContext } from '../../context/AuthContext';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
+// Users per /api/users page (highest XP first); the first page doubles as
+// the leaderboard
+const USERS_PAGE_SIZE = 50;
+
+// One keyset page of /api/users, optionally filtered server-side by ``q``
+const fetchUsersPage = async (token, { cursor = null, q = '', limit = USERS_PAGE_SIZE } = {}) => {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) params.set('cursor', cursor);
+  if (q) params.set('q', q);
+  const response = await fetch(`${API_URL}/api/users?${params}`, {
+    headers: { 'Authorization': `Bearer ${token}` }
+  });
+
+  if (!response.ok) throw new Error('Failed to fetch users');
+
+  return {
+    users: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor')
+  };
+};
+
 // Helper function to get pet emoji (not a hook - can be used anywhere)
 const getPetEmojiForLevel = (level) => {
   const petThemes = {
@@ -96,63 +117,38 @@ export const SocialPage = () => {
   const [activeTab, setActiveTab] = useState('discover');
   const [searchQuery, setSearchQuery] = useState('');
   const [allUsers, setAllUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchResults, setSearchResults] = useState([]);
   const [leaderboard, setLeaderboard] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedUser, setSelectedUser] = useState(null);
 
   useEffect(() => {
-    fetchUsers();
-    fetchLeaderboard();
+    fetchFirstPage();
   }, []);
 
-  const fetchUsers = async () => {
-    try {
-      const response = await fetch(`${API_URL}/api/users`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-
-      if (!response.ok) throw new Error('Failed to fetch users');
+  const buildLeaderboard = (users) => users
+    .map((u, idx) => ({
+      rank: idx + 1,
+      username: u.username,
+      level: u.level || 1,
+      xp: u.xp || 0,
+      badge: idx === 0 ? '👑' : idx === 1 ? '🥈' : idx === 2 ? '🥉' : '⭐',
+      isCurrentUser: u.id === user?.id
+    }));
 
-      const data = await response.json();
-      const users = data.filter(u => u.id !== user?.id);
-      setAllUsers(users);
-      setLoading(false);
+  // One request per page view: the first page is already ordered by XP,
+  // so it is both the top of the leaderboard and the start of the list
+  const fetchFirstPage = async () => {
+    try {
+      const page = await fetchUsersPage(token);
+      setLeaderboard(buildLeaderboard(page.users));
+      setAllUsers(page.users.filter(u => u.id !== user?.id));
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error fetching users:', error);
       setAllUsers([]);
-      setLoading(false);
-    }
-  };
-
-  const fetchLeaderboard = async () => {
-    try {
-      const response = await fetch(`${API_URL}/api/users`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-
-      if (!response.ok) throw new Error('Failed to fetch leaderboard');
-
-      const data = await response.json();
-      const sorted = data
-        .map(u => ({
-          ...u,
-          xp: u.xp || 0,
-          level: u.level || 1
-        }))
-        .sort((a, b) => b.xp - a.xp)
-        .map((u, idx) => ({
-          rank: idx + 1,
-          username: u.username,
-          level: u.level,
-          xp: u.xp,
-          badge: idx === 0 ? '👑' : idx === 1 ? '🥈' : idx === 2 ? '🥉' : '⭐',
-          isCurrentUser: u.id === user?.id
-        }));
-      
-      setLeaderboard(sorted);
-    } catch (error) {
-      console.error('Error fetching leaderboard:', error);
       if (userStats) {
         setLeaderboard([{
           rank: 1,
@@ -164,28 +160,45 @@ export const SocialPage = () => {
         }]);
       }
     }
+    setLoading(false);
   };
 
-  const handleSearch = () => {
-    if (searchQuery.trim() === '') {
+  const loadMoreUsers = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchUsersPage(token, { cursor: nextCursor });
+      setAllUsers(prev => [...prev, ...page.users.filter(u => u.id !== user?.id)]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching more users:', error);
+    }
+    setLoadingMore(false);
+  };
+
+  // Searched on the server, so users not loaded yet are found too
+  const handleSearch = async (query) => {
+    if (query === '') {
       setSearchResults([]);
       return;
     }
-    
-    const results = allUsers.filter(u => 
-      u.username.toLowerCase().includes(searchQuery.toLowerCase()) ||
-      (u.full_name && u.full_name.toLowerCase().includes(searchQuery.toLowerCase()))
-    );
-    setSearchResults(results);
+
+    try {
+      const page = await fetchUsersPage(token, { q: query, limit: 20 });
+      setSearchResults(page.users.filter(u => u.id !== user?.id));
+    } catch (error) {
+      console.error('Error searching users:', error);
+      setSearchResults([]);
+    }
   };
 
   useEffect(() => {
     const timer = setTimeout(() => {
-      handleSearch();
+      handleSearch(searchQuery.trim());
     }, 300);
     
     return () => clearTimeout(timer);
-  }, [searchQuery, allUsers]);
+  }, [searchQuery]);
 
   if (loading) {
     return (
@@ -296,7 +309,7 @@ export const SocialPage = () => {
             )}
 
             <div className="bg-slate-900/50 backdrop-blur border border-purple-500/30 rounded-2xl p-6">
-              <h3 className="text-xl font-bold text-white mb-4">All Users ({allUsers.length})</h3>
+              <h3 className="text-xl font-bold text-white mb-4">All Users ({allUsers.length}{nextCursor ? '+' : ''})</h3>
               
               {allUsers.length === 0 ? (
                 <div className="text-center py-8 text-gray-400">
@@ -331,6 +344,15 @@ export const SocialPage = () => {
                       </div>
                     </div>
                   ))}
+                  {nextCursor && (
+                    <button
+                      onClick={loadMoreUsers}
+                      disabled={loadingMore}
+                      className="w-full py-3 bg-slate-800/50 border border-purple-500/20 rounded-xl text-purple-300 hover:bg-slate-800 disabled:opacity-50 transition-all duration-300"
+                    >
+                      {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  )}
                 </div>
               )}
             </div>
@@ -360,6 +382,7 @@ export const SocialPage = () => {
             <div className="bg-slate-900/50 backdrop-blur border border-purple-500/30 rounded-2xl p-6">
               <div className="flex items-center justify-between mb-6">
                 <h3 className="text-xl font-bold text-white">Global Leaderboard</h3>
+                <span className="text-sm text-gray-400">Top {USERS_PAGE_SIZE}</span>
               </div>
 
               {leaderboard.length === 0 ? (
@@ -14,7 +14,10 @@ function useFocusTracker(wsUrl) {
     history: []
   });
   
-  const { status: wsStatus, lastMessage, sendMessage } = useWebSocket(wsUrl);
+  // Capture interval advertised by the server (load- and state-adaptive)
+  const [captureInterval, setCaptureInterval] = useState(2000);
+  
+  const { status: wsStatus, lastMessage, sendMessage, sendBinary } = useWebSocket(wsUrl);
   
   useEffect(() => {
     if (lastMessage) {
@@ -22,6 +25,9 @@ function useFocusTracker(wsUrl) {
         console.log('✅ Connection confirmed:', lastMessage.message);
       } else if (lastMessage.type === 'detection') {
         console.log('🎯 Updating focus data:', lastMessage);
+        if (lastMessage.recommended_interval_ms) {
+          setCaptureInterval(lastMessage.recommended_interval_ms);
+        }
         setFocusData(prev => ({
           score: lastMessage.focus_score,
           status: lastMessage.status,
@@ -38,7 +44,7 @@ function useFocusTracker(wsUrl) {
     }
   }, [lastMessage]);
   
-  return { focusData, wsStatus, sendMessage };
+  return { focusData, wsStatus, sendMessage, sendBinary, captureInterval };
 }
 
 export default useFocusTracker;
\ No newline at end of file
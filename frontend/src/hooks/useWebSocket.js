@@ -24,6 +24,7 @@ function useWebSocket(url) {
       console.log('URL:', `${url}?token=${token.substring(0, 20)}...`);
       
       const websocket = new WebSocket(`${url}?token=${token}`);
+      websocket.binaryType = 'arraybuffer';
       wsRef.current = websocket;
       
       websocket.onopen = () => {
@@ -84,7 +85,15 @@ function useWebSocket(url) {
     }
   }, [status]);
   
-  return { ws, status, lastMessage, sendMessage };
+  const sendBinary = useCallback((buffer) => {
+    if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+      wsRef.current.send(buffer);
+    } else {
+      console.warn('⚠️ WebSocket not connected. Status:', status);
+    }
+  }, [status]);
+  
+  return { ws, status, lastMessage, sendMessage, sendBinary };
 }
 
 export default useWebSocket;
\ No newline at end of file